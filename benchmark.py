@@ -0,0 +1,1021 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from book import Book
+
+
+def make_books(count):
+    """Generates a synthetic library of the given size."""
+    statuses = ["Unread", "In Progress", "Read"]
+    return [
+        Book(
+            title=f"Book Title {i}",
+            author=f"Author {i % 5000}",
+            isbn=f"{9780000000000 + i}",
+            cover_url=f"https://covers.openlibrary.org/b/isbn/{9780000000000 + i}-L.jpg",
+            status=statuses[i % 3],
+            cover_image_path=f"user_data/user_images/{9780000000000 + i}.jpg"
+        )
+        for i in range(count)
+    ]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_storage(sizes):
+    """Compares the JSON and SQLite storage engines."""
+    from storage_engine import JSONStorageEngine
+    from sqlite_storage import SQLiteStorageEngine
+
+    print(f"{'engine':<8} {'books':>8} {'save':>10} {'load':>10} {'set_status':>12} {'add':>10} {'remove':>10}")
+    for size in sizes:
+        books = make_books(size)
+        middle = books[size // 2].isbn
+        new_book = Book("New Book", "New Author", "9790000000000").to_dict()
+
+        for name in ("json", "sqlite"):
+            directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+            try:
+                if name == "json":
+                    engine = JSONStorageEngine(lambda username: os.path.join(directory, username))
+                else:
+                    engine = SQLiteStorageEngine(os.path.join(directory, "shelflife.db"))
+
+                save_time, _ = timed(engine.save_list, "bench", "collection", books)
+                load_time, loaded = timed(engine.load_list, "bench", "collection")
+                assert len(loaded) == size
+                status_time, _ = timed(engine.apply_mutations, "bench", "collection", [("set_status", middle, "Read")])
+                add_time, _ = timed(engine.apply_mutations, "bench", "collection", [("add", new_book)])
+                remove_time, _ = timed(engine.apply_mutations, "bench", "collection", [("remove", middle)])
+                engine.close()
+
+                print(
+                    f"{name:<8} {size:>8} {save_time * 1000:>8.1f}ms {load_time * 1000:>8.1f}ms "
+                    f"{status_time * 1000:>10.2f}ms {add_time * 1000:>8.2f}ms {remove_time * 1000:>8.2f}ms"
+                )
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_journal(sizes):
+    """Measures journaled mutation cost and recovery from a torn journal write."""
+    from storage_engine import JSONStorageEngine
+    from journal_storage import JournalStorageEngine
+
+    print(f"{'books':>8} {'json set_status':>16} {'journal set_status':>19} {'replay load':>12}")
+    for size in sizes:
+        books = make_books(size)
+        directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+        try:
+            user_directory = lambda username: os.path.join(directory, username)
+            json_engine = JSONStorageEngine(user_directory)
+            journal_engine = JournalStorageEngine(user_directory, compact_threshold=1 << 30)
+            json_engine.save_list("bench", "collection", books)
+
+            json_time, _ = timed(json_engine.apply_mutations, "bench", "collection", [("set_status", books[0].isbn, "Read")])
+            start = time.perf_counter()
+            for book in books[:100]:
+                journal_engine.apply_mutations("bench", "collection", [("set_status", book.isbn, "Read")])
+            journal_time = (time.perf_counter() - start) / 100
+            load_time, loaded = timed(journal_engine.load_list, "bench", "collection")
+            assert all(book.status == "Read" for book in loaded[:100])
+
+            print(f"{size:>8} {json_time * 1000:>14.2f}ms {journal_time * 1000:>17.3f}ms {load_time * 1000:>10.1f}ms")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    # Simulate a crash part-way through appending a record at every possible byte offset
+    directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+    try:
+        engine = JournalStorageEngine(lambda username: os.path.join(directory, username), fsync=False)
+        books = make_books(10)
+        engine.save_list("crash", "collection", books)
+        engine.apply_mutations("crash", "collection", [("set_status", books[0].isbn, "Read")])
+        log_path = engine.log_path("crash", "collection")
+        committed = os.path.getsize(log_path)
+        engine.apply_mutations("crash", "collection", [("remove", books[1].isbn)])
+        with open(log_path, "rb") as file:
+            full_log = file.read()
+
+        for cut in range(committed, len(full_log)):
+            with open(log_path, "wb") as file:
+                file.write(full_log[:cut])
+            loaded = engine.load_list("crash", "collection")
+            assert loaded[0].status == "Read" and len(loaded) == 10, f"bad recovery at byte {cut}"
+            # Readers leave the file alone; the next writer drops the torn tail
+            assert os.path.getsize(log_path) == cut
+            engine.apply_mutations("crash", "collection", [("set_status", books[2].isbn, "Read")])
+            loaded = engine.load_list("crash", "collection")
+            assert len(loaded) == 10 and loaded[2].status == "Read", f"bad repair at byte {cut}"
+            with open(log_path, "rb") as file:
+                assert file.read().startswith(full_log[:committed])
+        print(f"Torn-write recovery verified at {len(full_log) - committed} truncation points")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def open_engine(name, directory):
+    from storage_engine import JSONStorageEngine
+    from journal_storage import JournalStorageEngine
+    from sqlite_storage import SQLiteStorageEngine
+
+    if name == "sqlite":
+        return SQLiteStorageEngine(os.path.join(directory, "shelflife.db"))
+    engine_class = JournalStorageEngine if name == "journal" else JSONStorageEngine
+    return engine_class(lambda username: os.path.join(directory, username))
+
+
+def stress_worker(engine_name, directory, worker, mutations, blind):
+    """One process adding its own books and marking each one read, like a running app."""
+    from collection import Collection
+    from storage_engine import apply_mutation
+
+    engine = open_engine(engine_name, directory)
+    collection = Collection()
+    base = engine.signature("stress", "collection")
+    collection.books = engine.load_list("stress", "collection")
+    merges = 0
+    for i in range(mutations):
+        isbn = f"{worker:03d}{i // 2:010d}"
+        if i % 2 == 0:
+            mutation = ("add", Book(f"Book {isbn}", f"Author {worker}", isbn).to_dict())
+        else:
+            mutation = ("set_status", isbn, "Read")
+        apply_mutation(collection, mutation)
+
+        if blind:
+            # What every save did before lists were versioned: overwrite with our copy
+            engine.save_list("stress", "collection", list(collection))
+            continue
+        signature = engine.write_changes("stress", "collection", [mutation], list(collection), base)
+        if signature is None:
+            # Someone else wrote in between; our change was merged, so pick theirs up
+            merges += 1
+            base = engine.signature("stress", "collection")
+            collection.books = engine.load_list("stress", "collection")
+        else:
+            base = signature
+    engine.close()
+    return merges
+
+
+def bench_stress(engines, processes, mutations, blind):
+    """Runs several processes mutating one shared list and checks that no update is lost."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    modes = [False, True] if blind else [False]
+    print(f"{'engine':<8} {'mode':<10} {'processes':>9} {'mutations':>10} {'time':>9} {'mutations/sec':>14} "
+          f"{'merges':>7} {'lost updates':>13}")
+    for engine_name in engines:
+        for blind_mode in modes:
+            directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+            try:
+                start = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    merges = sum(executor.map(
+                        stress_worker, [engine_name] * processes, [directory] * processes,
+                        range(processes), [mutations] * processes, [blind_mode] * processes
+                    ))
+                elapsed = time.perf_counter() - start
+
+                engine = open_engine(engine_name, directory)
+                stored = {book.isbn: book.status for book in engine.load_list("stress", "collection")}
+                engine.close()
+                # Even mutations added a book and odd ones marked it read
+                lost = 0
+                for worker in range(processes):
+                    for i in range(mutations):
+                        isbn = f"{worker:03d}{i // 2:010d}"
+                        if isbn not in stored or (i % 2 == 1 and stored[isbn] != "Read"):
+                            lost += 1
+                total = processes * mutations
+                mode = "blind" if blind_mode else "versioned"
+                print(f"{engine_name:<8} {mode:<10} {processes:>9} {total:>10} {elapsed:>8.2f}s "
+                      f"{total / elapsed:>14.0f} {merges:>7} {lost:>13}")
+                if not blind_mode:
+                    assert lost == 0, f"{lost} updates lost with the {engine_name} engine"
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_write_behind(size, changes, interval):
+    """Counts disk writes caused by a burst of status changes through the write-behind queue."""
+    import storage
+    from storage_engine import JSONStorageEngine
+    from collection import Collection
+
+    directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+    try:
+        storage.set_storage_engine(JSONStorageEngine(lambda username: os.path.join(directory, username)))
+        collection = Collection()
+        collection.books = make_books(size)
+        storage.save_collection("bench", collection)
+        queue = storage.WriteBehindQueue(interval)
+
+        start = time.perf_counter()
+        for book in collection.books[:changes]:
+            book.status = "Read"
+            queue.enqueue("bench", "collection", ("set_status", book.isbn, "Read"), collection)
+        enqueue_time = time.perf_counter() - start
+        queue.flush()
+        total_time = time.perf_counter() - start
+
+        reloaded = storage.load_collection("bench")
+        assert all(book.status == "Read" for book in reloaded.to_list()[:changes])
+        print(
+            f"{changes} status changes on {size} books: {queue.writes} disk write(s), "
+            f"{enqueue_time / changes * 1e6:.1f}us per change on the caller, {total_time * 1000:.0f}ms until durable"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_stream(sizes):
+    """Compares time-to-first-record, total time and peak memory of the JSON load paths."""
+    import json
+    import tracemalloc
+    from storage_engine import JSONStorageEngine, book_from_dict
+    from collection import Collection
+
+    print(f"{'books':>8} {'path':<22} {'first record':>13} {'total':>10} {'peak memory':>12}")
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+        try:
+            engine = JSONStorageEngine(lambda username: os.path.join(directory, username))
+            engine.save_list("bench", "collection", make_books(size))
+            path = engine.list_path("bench", "collection")
+
+            def whole_file():
+                # The previous loader: parse everything, then build every Book
+                with open(path, "r") as file:
+                    records = json.load(file)
+                first = time.perf_counter()
+                books = [book_from_dict(record) for record in records]
+                return first, books
+
+            def streaming():
+                books = engine.iter_list("bench", "collection")
+                collection = Collection()
+                collection.add_books([next(books)])
+                first = time.perf_counter()
+                collection.add_books(books)
+                return first, collection.books
+
+            for name, loader in (("json.load (no dedupe)", whole_file), ("streaming + dedupe", streaming)):
+                start = time.perf_counter()
+                first, books = loader()
+                total = time.perf_counter() - start
+                assert len(books) == size
+                del books
+
+                # Measure memory in a separate run since tracing slows everything down
+                tracemalloc.start()
+                loader()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{size:>8} {name:<22} {(first - start) * 1000:>11.1f}ms {total * 1000:>8.0f}ms {peak / 2 ** 20:>9.1f}MiB")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_binary(sizes):
+    """Compares the binary library format with JSON for size, open time and full scans."""
+    import json
+    from binary_format import BinaryLibrary, write_binary
+    from storage_engine import book_from_dict
+
+    print(f"{'books':>8} {'format':<7} {'file size':>10} {'open + first':>13} {'all Books':>10}")
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+        try:
+            books = make_books(size)
+            json_path = os.path.join(directory, "collection.json")
+            binary_path = os.path.join(directory, "collection.slib")
+            with open(json_path, "w") as file:
+                json.dump([book.to_dict() for book in books], file, indent=4)
+            write_binary(binary_path, books)
+
+            start = time.perf_counter()
+            with open(json_path, "r") as file:
+                records = json.load(file)
+            first = records[0]
+            json_open = time.perf_counter() - start
+            json_scan = json_open + timed(lambda: [book_from_dict(record) for record in records])[0]
+
+            start = time.perf_counter()
+            with BinaryLibrary(binary_path) as library:
+                first = library[0]
+                binary_open = time.perf_counter() - start
+                binary_scan = binary_open + timed(lambda: list(library))[0]
+            assert first.isbn == books[0].isbn
+
+            for name, path, open_time, scan_time in (
+                ("json", json_path, json_open, json_scan), ("binary", binary_path, binary_open, binary_scan)
+            ):
+                print(
+                    f"{size:>8} {name:<7} {os.path.getsize(path) / 2 ** 20:>7.1f}MiB "
+                    f"{open_time * 1000:>11.2f}ms {scan_time * 1000:>8.0f}ms"
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_covers(books, distinct):
+    """Measures cover saving through the content-addressed store against a local image server."""
+    import threading
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from cover_store import CoverStore, JPEG_MAGIC
+
+    # Fake JPEG payloads; the store only needs the magic bytes to keep them as-is
+    payloads = [JPEG_MAGIC + os.urandom(40 * 1024) for _ in range(distinct)]
+
+    class CoverHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            data = payloads[int(self.path.strip("/").split(".")[0])]
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), CoverHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+    try:
+        store = CoverStore(directory)
+        url = "http://127.0.0.1:%d/%d.jpg"
+        first_time, _ = timed(lambda: [
+            store.save_cover(url % (server.server_port, i % distinct), f"{9780000000000 + i}") for i in range(books)
+        ])
+        again_time, _ = timed(lambda: [
+            store.save_cover(url % (server.server_port, i % distinct), f"{9780000000000 + i}") for i in range(books)
+        ])
+        used = sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(store.objects_dir) for name in names
+        )
+        print(f"{books} books sharing {distinct} covers")
+        print(f"  first add:  {first_time / books * 1000:.2f}ms per book")
+        print(f"  re-add:     {again_time / books * 1000:.3f}ms per book")
+        print(f"  disk usage: {used / 2 ** 20:.1f}MiB (one file per ISBN would be {books * len(payloads[0]) / 2 ** 20:.1f}MiB)")
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_export(sizes, export_format):
+    """Checks that exporting a list keeps memory flat as the library grows."""
+    import tracemalloc
+    from storage_engine import JSONStorageEngine
+    from export import export_books, open_export_file
+
+    print(f"{'books':>8} {'path':<18} {'time':>10} {'books/sec':>12} {'peak memory':>12}")
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+        try:
+            engine = JSONStorageEngine(lambda username: os.path.join(directory, username))
+            engine.save_list("bench", "collection", make_books(size))
+            output = os.path.join(directory, "export")
+
+            def streaming():
+                with open_export_file(output, False) as file:
+                    return export_books(engine.iter_list("bench", "collection"), file, export_format)
+
+            def whole_list():
+                # Loading the list first, as copying collection.json through load_collection would
+                books = engine.load_list("bench", "collection")
+                with open_export_file(output, False) as file:
+                    return export_books(books, file, export_format)
+
+            for name, exporter in (("load then write", whole_list), ("streaming", streaming)):
+                elapsed, count = timed(exporter)
+                assert count == size
+                tracemalloc.start()
+                exporter()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{size:>8} {name:<18} {elapsed * 1000:>8.0f}ms {size / elapsed:>12.0f} {peak / 2 ** 20:>9.1f}MiB")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+# Modules that must not be imported before the login page is shown
+LAZY_MODULES = ("cv2", "pyzbar", "requests", "PIL", "bcrypt", "numpy", "multiprocessing")
+
+
+def bench_startup(budget_ms, runs):
+    """Times a cold import of the GUI with -X importtime; returns 1 if it is over budget."""
+    import subprocess
+
+    totals = []
+    loaded = set()
+    created = set()
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="shelflife_bench_") as directory:
+            # A fresh data directory shows that importing doesn't touch the disk either
+            env = dict(os.environ, SHELFLIFE_DATA_DIR=os.path.join(directory, "user_data"))
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "import ui"],
+                cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                print(result.stderr.strip().splitlines()[-1])
+                return 1
+            created.update(os.listdir(directory))
+
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            loaded.add(name.strip().split(".")[0])
+            if name.strip() == "ui":
+                totals.append(int(cumulative) / 1000)
+
+    best = min(totals)
+    eager = sorted(set(LAZY_MODULES) & loaded)
+    print(f"import ui: best {best:.0f}ms of {runs} runs (budget {budget_ms:.0f}ms)")
+    print(f"heavy modules imported at startup: {', '.join(eager) or 'none'}")
+    print(f"files created on import: {', '.join(sorted(created)) or 'none'}")
+    if best > budget_ms or eager or created:
+        print("FAIL: startup regressed")
+        return 1
+    print("OK")
+    return 0
+
+
+class LinearCollection:
+    """The list-scanning Collection that BookList replaced, kept for comparison."""
+
+    def __init__(self):
+        self.books = []
+
+    def add_book(self, book):
+        if not any(existing_book.isbn == book.isbn for existing_book in self.books):
+            self.books.append(book)
+            return True
+        return False
+
+    def get_book_by_isbn(self, isbn):
+        for book in self.books:
+            if book.isbn == isbn:
+                return book
+        return None
+
+    def remove_book(self, isbn):
+        self.books = [book for book in self.books if book.isbn != isbn]
+
+
+def bench_collection(sizes, max_linear):
+    """Loads books one add_book at a time, then looks up and removes some of them."""
+    from collection import Collection
+
+    print(f"{'books':>8} {'implementation':<16} {'load':>10} {'per book':>10} {'1000 lookups':>13} {'100 removes':>12}")
+    for size in sizes:
+        books = make_books(size)
+        isbns = [book.isbn for book in books[::max(1, size // 1000)]][:1000]
+        for name, collection_class in (("list scan", LinearCollection), ("ISBN index", Collection)):
+            if collection_class is LinearCollection and size > max_linear:
+                print(f"{size:>8} {name:<16} {'skipped (quadratic)':>21}")
+                continue
+            collection = collection_class()
+
+            def load():
+                for book in books:
+                    collection.add_book(book)
+
+            def lookups():
+                for isbn in isbns:
+                    collection.get_book_by_isbn(isbn)
+
+            def removes():
+                for isbn in isbns[:100]:
+                    collection.remove_book(isbn)
+
+            load_time, _ = timed(load)
+            lookup_time, _ = timed(lookups)
+            remove_time, _ = timed(removes)
+            print(f"{size:>8} {name:<16} {load_time * 1000:>8.0f}ms {load_time / size * 1e6:>8.2f}us "
+                  f"{lookup_time * 1000:>11.2f}ms {remove_time * 1000:>10.2f}ms")
+
+
+def resort_books(books, alpha, choice):
+    """The sort_books that ran on every switch before sort orders were indexed."""
+    books = sorted(books, key=lambda book: "".join(filter(str.isalpha, getattr(book, choice))))
+    if alpha == False:
+        books.reverse()
+    return books
+
+
+def bench_sort(sizes, changes):
+    """Compares re-sorting on every sort switch with iterating maintained sort indexes."""
+    from collection import Collection
+    from book_list import sort_key
+
+    switches = [(True, "title"), (True, "author"), (False, "title"), (False, "author")]
+    print(f"{'books':>8} {'4 re-sorts':>11} {'build indexes':>14} {'4 switches':>11} "
+          f"{f'{changes} adds':>11} {f'{changes} status':>11}")
+    for size in sizes:
+        books = make_books(size)
+        for i, book in enumerate(books):
+            book.date_added = f"2024-01-01T00:00:{i % 60:02d}+00:00"
+        collection = Collection()
+        collection.add_books(books)
+
+        resort_time, _ = timed(lambda: [resort_books(books, alpha, choice) for alpha, choice in switches])
+        build_time, _ = timed(lambda: [collection.sort_index(choice) for choice in ("title", "author", "status", "date_added")])
+        switch_time, _ = timed(lambda: [collection.sorted_books(choice, alpha) for alpha, choice in switches])
+
+        extra = make_books(size + changes)[size:]
+        add_time, _ = timed(lambda: [collection.add_book(book) for book in extra])
+        statuses = ["Read", "Unread"]
+        status_time, _ = timed(
+            lambda: [collection.set_status(book.isbn, statuses[i % 2]) for i, book in enumerate(books[:changes])]
+        )
+
+        # The maintained orders must match sorting from scratch
+        for choice in ("title", "author", "status", "date_added"):
+            expected = [book.isbn for book in sorted(collection, key=lambda book: sort_key(book, choice))]
+            actual = [book.isbn for book in collection.sorted_books(choice)]
+            if [sort_key(collection.get_book_by_isbn(isbn), choice) for isbn in actual] != \
+                    [sort_key(collection.get_book_by_isbn(isbn), choice) for isbn in expected]:
+                print(f"{choice} order is wrong after changes")
+                return 1
+
+        print(f"{size:>8} {resort_time * 1000:>9.0f}ms {build_time * 1000:>12.0f}ms {switch_time * 1000:>9.1f}ms "
+              f"{add_time * 1000:>9.1f}ms {status_time * 1000:>9.1f}ms")
+    return 0
+
+
+def make_library(count, seed=0):
+    """Generates books with varied titles and authors drawn from a synthetic vocabulary."""
+    import random
+
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ren", "sa", "tor", "vel", "qua", "dri", "mon", "el", "ast", "ber", "fin", "gal"]
+    words = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)})
+    surnames = words[::7]
+    books = make_books(count)
+    for book in books:
+        book.title = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5))).title()
+        book.author = f"{rng.choice(words).title()} {rng.choice(surnames).title()}"
+    return books
+
+
+def bench_search(sizes, queries):
+    """Times inverted-index queries against the substring scan search_books used to do."""
+    from collection import Collection
+    from search_index import SearchIndex
+    import random
+
+    print(f"{'books':>8} {'build':>8} {'save':>8} {'load':>8} {'scan/query':>11} {'index median':>13} {'p95':>8}")
+    for size in sizes:
+        books = make_library(size)
+        rng = random.Random(1)
+        samples = [rng.choice(books) for _ in range(queries)]
+        # Whole words, prefixes, two-word AND queries, authors and ISBN prefixes
+        terms = []
+        for i, book in enumerate(samples):
+            kind = i % 4
+            if kind == 0:
+                terms.append(book.title.split()[0])
+            elif kind == 1:
+                terms.append(book.title.split()[0][:4])
+            elif kind == 2:
+                terms.append(f"{book.author.split()[1]} {book.title.split()[-1][:3]}")
+            else:
+                terms.append(book.isbn[:10])
+
+        collection = Collection()
+        collection.add_books(books)
+        build_time, index = timed(lambda: SearchIndex.build(books))
+        directory = tempfile.mkdtemp(prefix="shelflife_bench_")
+        try:
+            path = os.path.join(directory, "collection_search.json")
+            save_time, _ = timed(index.save, path)
+            load_time, loaded = timed(SearchIndex.load, path)
+        finally:
+            shutil.rmtree(directory)
+        if loaded.documents != index.documents:
+            print("Loaded index differs from the saved one")
+            return 1
+        collection.search_index = index
+
+        def scan(query):
+            query = query.lower().strip()
+            return [book for book in books if query in book.title.lower() or query in book.isbn.lower()]
+
+        scan_time, _ = timed(lambda: [scan(term) for term in terms[:20]])
+        latencies = []
+        for term in terms:
+            elapsed, results = timed(collection.search_books, term)
+            latencies.append(elapsed)
+            if not results:
+                print(f"No results for '{term}'")
+                return 1
+        latencies.sort()
+        print(f"{size:>8} {build_time * 1000:>6.0f}ms {save_time * 1000:>6.0f}ms {load_time * 1000:>6.0f}ms "
+              f"{scan_time / 20 * 1000:>9.2f}ms {latencies[len(latencies) // 2] * 1000:>11.3f}ms "
+              f"{latencies[len(latencies) * 95 // 100] * 1000:>6.2f}ms")
+    return 0
+
+
+def misspell(word, rng):
+    """Changes, drops or swaps one letter of a word."""
+    position = rng.randrange(1, len(word) - 1) if len(word) > 2 else 0
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:position] + rng.choice("aeioulnrst") + word[position + 1:]
+    if kind == 1:
+        return word[:position] + word[position + 1:]
+    return word[:position] + word[position + 1:position + 2] + word[position] + word[position + 2:]
+
+
+def bench_fuzzy(sizes, queries, threshold):
+    """Times trigram fuzzy search on misspelled titles and authors, and how often it finds the book."""
+    from collection import Collection
+    from search_index import SearchIndex, tokenize
+    import difflib
+    import random
+
+    print(f"{'books':>8} {'build':>8} {'pairwise/query':>15} {'index median':>13} {'p95':>8} {'found':>7} {'exact found':>12}")
+    for size in sizes:
+        books = make_library(size)
+        rng = random.Random(2)
+        samples = [rng.choice(books) for _ in range(queries)]
+        terms = []
+        for i, book in enumerate(samples):
+            words = tokenize(book.author if i % 2 else book.title)
+            words = [word for word in words if len(word) >= 5] or words
+            terms.append(misspell(rng.choice(words), rng))
+
+        collection = Collection()
+        collection.add_books(books)
+        build_time, collection.search_index = timed(lambda: SearchIndex.build(books))
+        index = collection.search_index
+
+        # What the index avoids: comparing the term with every word of every book
+        def pairwise(term):
+            return [
+                book for book in books
+                if any(difflib.SequenceMatcher(None, term, word).ratio() >= 0.75
+                       for word in tokenize(f"{book.title} {book.author}"))
+            ]
+
+        pairwise_queries = 2 if size > 20000 else 5
+        pairwise_time, _ = timed(lambda: [pairwise(term) for term in terms[:pairwise_queries]])
+
+        latencies = []
+        found = exact_found = 0
+        for term, book in zip(terms, samples):
+            elapsed, scores = timed(index.search, term, True, threshold)
+            latencies.append(elapsed)
+            found += bool(scores) and book.isbn in scores
+            exact = index.search(term)
+            exact_found += bool(exact) and book.isbn in exact
+        latencies.sort()
+        print(f"{size:>8} {build_time * 1000:>6.0f}ms {pairwise_time / pairwise_queries * 1000:>13.0f}ms "
+              f"{latencies[len(latencies) // 2] * 1000:>11.3f}ms {latencies[len(latencies) * 95 // 100] * 1000:>6.2f}ms "
+              f"{found / queries:>7.0%} {exact_found / queries:>12.0%}")
+    return 0
+
+
+class DictBook:
+    """The Book that used a per-instance __dict__ and kept its own copy of every string."""
+
+    def __init__(self, title, author, isbn, cover_url=None, status="Unread", cover_image_path=None,
+                 date_added=None):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.cover_url = cover_url
+        self.status = status
+        self.cover_image_path = cover_image_path
+        self.date_added = date_added
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "author": self.author,
+            "isbn": self.isbn,
+            "cover_url": self.cover_url,
+            "status": self.status,
+            "cover_image_path": self.cover_image_path,
+            "date_added": self.date_added
+        }
+
+
+def traced(func):
+    """Returns (memory still allocated, peak memory, result) of calling func, in bytes."""
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, peak, result
+
+
+def bench_memory(sizes):
+    """Compares memory held by loaded books and peak memory while saving them, with tracemalloc."""
+    import json
+    from storage_engine import write_books_json
+
+    print(f"{'books':>8} {'class':<10} {'held':>9} {'per book':>9} {'save peak':>10}")
+    for size in sizes:
+        # make_books repeats 5000 authors, about what a large shared library looks like
+        books = make_books(size)
+        for i, book in enumerate(books):
+            book.date_added = f"2024-01-01T00:00:{i % 60:02d}+00:00"
+        encoded = json.dumps([book.to_dict() for book in books])
+        del books
+
+        for name, book_class in (("dict", DictBook), ("slots", Book)):
+            # What stays allocated once the parsed records are gone: the books and their strings
+            held, _, loaded = traced(lambda: [book_class(**record) for record in json.loads(encoded)])
+
+            with open(os.devnull, "w") as devnull:
+                if book_class is DictBook:
+                    _, save_peak, _ = traced(lambda: json.dump([book.to_dict() for book in loaded], devnull, indent=4))
+                else:
+                    _, save_peak, _ = traced(lambda: write_books_json(devnull, loaded))
+            del loaded
+            print(f"{size:>8} {name:<10} {held / 2 ** 20:>7.1f}MB {held / size:>7.0f}B "
+                  f"{save_peak / 2 ** 20:>8.1f}MB")
+    return 0
+
+
+def bench_table(sizes, runs):
+    """Compares status and combined filters and counts on the NumPy table with Python loops."""
+    from book_table import BookTable, load_numpy, date_seconds
+
+    numpy = load_numpy()
+    if numpy is None:
+        print("numpy is not installed")
+        return 1
+
+    print(f"{'books':>8} {'operation':<26} {'loop':>9} {'table':>9} {'speedup':>8}")
+    for size in sizes:
+        books = make_books(size)
+        for i, book in enumerate(books):
+            book.date_added = f"20{10 + i % 15}-01-01T00:00:00+00:00"
+        build_time, table = timed(BookTable, numpy, books)
+        print(f"{size:>8} {'build table':<26} {'':>9} {build_time * 1000:>7.0f}ms")
+        after = "2018-01-01T00:00:00+00:00"
+        after_seconds = date_seconds(after)
+
+        def count_status_loop():
+            counts = {}
+            for book in books:
+                counts[book.status] = counts.get(book.status, 0) + 1
+            return counts
+
+        def count_author_loop():
+            counts = {}
+            for book in books:
+                counts[book.author] = counts.get(book.author, 0) + 1
+            return counts
+
+        cases = [
+            ("status filter",
+             lambda: [book for book in books if book.status == "Read"],
+             lambda: table.select(table.mask(status="Read"))),
+            ("status + author + date",
+             lambda: [book for book in books if book.status == "Read" and book.author == "Author 42"
+                      and date_seconds(book.date_added) >= after_seconds],
+             lambda: table.select(table.mask("Read", "Author 42", after))),
+            ("count by status", count_status_loop, table.count_by_status),
+            ("count by author", count_author_loop, table.count_by_author),
+        ]
+        for name, loop, vectorized in cases:
+            loop_time = min(timed(loop)[0] for _ in range(runs))
+            table_time = min(timed(vectorized)[0] for _ in range(runs))
+            expected, result = loop(), vectorized()
+            if isinstance(expected, list) and [book.isbn for book in expected] != result.isbns():
+                print(f"{name}: the table selected different books")
+                return 1
+            if isinstance(expected, dict) and expected != result:
+                print(f"{name}: the table counted differently")
+                return 1
+            print(f"{size:>8} {name:<26} {loop_time * 1000:>7.1f}ms {table_time * 1000:>7.2f}ms "
+                  f"{loop_time / table_time:>7.0f}x")
+    return 0
+
+
+def bench_stats(sizes, changes):
+    """Times maintained stats against recounting, and checks them after random changes."""
+    import random
+    from collection import Collection
+    from library_stats import LibraryStats
+
+    rng = random.Random(0)
+    statuses = ["Unread", "In Progress", "Read"]
+    print(f"{'books':>8} {'recount':>9} {'changes':>13} {'read stats':>11} {'save':>8} {'load':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            books = make_books(size)
+            for i, book in enumerate(books):
+                book.date_added = f"20{10 + i % 15}-{1 + i % 12:02d}-01T00:00:00+00:00"
+            # At most half the books change, so a small size still has books to remove
+            count = min(changes, size // 2)
+            collection = Collection()
+            collection.add_books(books[:size - count])
+            recount_time, _ = timed(LibraryStats.build, collection)
+            stats = collection.get_stats()
+
+            # Adds, removes and status changes in random order
+            extra = books[size - count:]
+            def change():
+                for i in range(count):
+                    operation = rng.randrange(3)
+                    if operation == 0:
+                        collection.add_book(extra[i])
+                    elif operation == 1:
+                        collection.remove_book(books[rng.randrange(size - count)].isbn)
+                    else:
+                        collection.set_status(books[rng.randrange(size - count)].isbn, rng.choice(statuses))
+            change_time, _ = timed(change)
+            read_time, _ = timed(lambda: (collection.count_by_status(), stats.top_authors(), stats.added_over_time()))
+
+            problems = stats.check(collection)
+            if problems:
+                print(f"stats differ from a recount: {problems[:5]}")
+                return 1
+
+            path = os.path.join(directory, f"stats_{size}.json")
+            save_time, _ = timed(stats.save, path)
+            load_time, loaded = timed(LibraryStats.load, path)
+            if loaded.check(collection):
+                print("saved stats differ from a recount")
+                return 1
+            print(f"{size:>8} {recount_time * 1000:>7.1f}ms {count:>4} {change_time * 1000:>6.1f}ms "
+                  f"{read_time * 1000:>9.2f}ms {save_time * 1000:>6.1f}ms {load_time * 1000:>6.1f}ms")
+    return 0
+
+
+def bench_query(sizes, offset, limit):
+    """Times one window of a sorted, status-filtered query against building the full list."""
+    from collection import Collection
+
+    print(f"{'books':>8} {'query':<24} {'full list':>10} {'first window':>13} {'window':>9} {'all pages':>10}")
+    for size in sizes:
+        books = make_books(size)
+        for i, book in enumerate(books):
+            book.date_added = f"2024-01-01T00:00:{i % 60:02d}+00:00"
+        collection = Collection()
+        collection.add_books(books)
+        for choice, status in (("title", "Read"), ("author", None), (None, "Unread")):
+            name = f"{choice or 'stored'}, status={status}"
+
+            def full_list():
+                return collection.filter_books(status=status, choice=choice)[offset:offset + limit]
+            # The first query builds the sort index and status subset; later ones only read the window
+            first_time, _ = timed(collection.query, choice, True, status, None, False, None, offset, limit)
+            full_time, expected = timed(full_list)
+            window_time, window = timed(collection.query, choice, True, status, None, False, None, offset, limit)
+            if [book.isbn for book in window] != [book.isbn for book in expected]:
+                print(f"{name}: the window differs from the full list")
+                return 1
+
+            def all_pages():
+                cursor, count = None, 0
+                while True:
+                    page = collection.query(choice, True, status, cursor=cursor, limit=limit)
+                    count += len(page)
+                    cursor = page.next_cursor
+                    if cursor is None:
+                        return count
+            pages_time, count = timed(all_pages)
+            if count != window.total:
+                print(f"{name}: paging by cursor read {count} of {window.total} books")
+                return 1
+            print(f"{size:>8} {name:<24} {full_time * 1000:>8.1f}ms {first_time * 1000:>11.0f}ms "
+                  f"{window_time * 1000000:>7.0f}us {pages_time * 1000:>8.0f}ms")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShelfLife performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    storage_parser = subparsers.add_parser("storage", help="compare storage engines")
+    storage_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+
+    journal_parser = subparsers.add_parser("journal", help="journaled mutations and crash recovery")
+    journal_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+
+    write_behind_parser = subparsers.add_parser("writebehind", help="coalescing of queued writes")
+    write_behind_parser.add_argument("--size", type=int, default=10000)
+    write_behind_parser.add_argument("--changes", type=int, default=50)
+    write_behind_parser.add_argument("--interval", type=float, default=1.0)
+
+    stream_parser = subparsers.add_parser("stream", help="streaming collection loader")
+    stream_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 200000])
+
+    binary_parser = subparsers.add_parser("binary", help="binary library format against JSON")
+    binary_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 200000])
+
+    covers_parser = subparsers.add_parser("covers", help="content-addressed cover store")
+    covers_parser.add_argument("--books", type=int, default=2000)
+    covers_parser.add_argument("--distinct", type=int, default=200)
+
+    export_parser = subparsers.add_parser("export", help="streaming CSV/JSONL export")
+    export_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    export_parser.add_argument("--format", choices=["csv", "jsonl", "goodreads"], default="csv")
+
+    stress_parser = subparsers.add_parser("stress", help="concurrent writers from several processes")
+    stress_parser.add_argument("--engines", nargs="+", choices=["json", "journal", "sqlite"],
+                               default=["json", "journal", "sqlite"])
+    stress_parser.add_argument("--processes", type=int, default=4)
+    stress_parser.add_argument("--mutations", type=int, default=1000, help="mutations per process")
+    stress_parser.add_argument("--blind", action="store_true", help="also run unversioned overwrites for comparison")
+
+    startup_parser = subparsers.add_parser("startup", help="cold import time of the GUI (fails over budget)")
+    startup_parser.add_argument("--budget-ms", type=float, default=1000)
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    collection_parser = subparsers.add_parser("collection", help="ISBN-indexed collection operations")
+    collection_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    collection_parser.add_argument("--max-linear", type=int, default=10000,
+                                   help="largest size to run the quadratic list scan at")
+
+    sort_parser = subparsers.add_parser("sort", help="maintained sort indexes against re-sorting")
+    sort_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    sort_parser.add_argument("--changes", type=int, default=1000)
+
+    search_parser = subparsers.add_parser("search", help="inverted-index search against a substring scan")
+    search_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    search_parser.add_argument("--queries", type=int, default=400)
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="trigram fuzzy search on misspelled queries")
+    fuzzy_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    fuzzy_parser.add_argument("--queries", type=int, default=400)
+    fuzzy_parser.add_argument("--threshold", type=float, default=None, help="default: FUZZY_THRESHOLD")
+
+    memory_parser = subparsers.add_parser("memory", help="tracemalloc comparison of Book representations")
+    memory_parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+
+    table_parser = subparsers.add_parser("table", help="vectorized filters on the NumPy table (needs numpy)")
+    table_parser.add_argument("--sizes", type=int, nargs="+", default=[1000000])
+    table_parser.add_argument("--runs", type=int, default=3)
+
+    stats_parser = subparsers.add_parser("stats", help="maintained library stats against recounting")
+    stats_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    stats_parser.add_argument("--changes", type=int, default=1000)
+
+    query_parser = subparsers.add_parser("query", help="windowed queries against building the full list")
+    query_parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    query_parser.add_argument("--offset", type=int, default=2000)
+    query_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.benchmark == "storage":
+        bench_storage(args.sizes)
+    elif args.benchmark == "journal":
+        bench_journal(args.sizes)
+    elif args.benchmark == "stream":
+        bench_stream(args.sizes)
+    elif args.benchmark == "binary":
+        bench_binary(args.sizes)
+    elif args.benchmark == "covers":
+        bench_covers(args.books, args.distinct)
+    elif args.benchmark == "writebehind":
+        bench_write_behind(args.size, args.changes, args.interval)
+    elif args.benchmark == "export":
+        bench_export(args.sizes, args.format)
+    elif args.benchmark == "stress":
+        bench_stress(args.engines, args.processes, args.mutations, args.blind)
+    elif args.benchmark == "collection":
+        bench_collection(args.sizes, args.max_linear)
+    elif args.benchmark == "sort":
+        return bench_sort(args.sizes, args.changes)
+    elif args.benchmark == "search":
+        return bench_search(args.sizes, args.queries)
+    elif args.benchmark == "fuzzy":
+        from search_index import FUZZY_THRESHOLD
+        return bench_fuzzy(args.sizes, args.queries, args.threshold or FUZZY_THRESHOLD)
+    elif args.benchmark == "memory":
+        return bench_memory(args.sizes)
+    elif args.benchmark == "table":
+        return bench_table(args.sizes, args.runs)
+    elif args.benchmark == "stats":
+        return bench_stats(args.sizes, args.changes)
+    elif args.benchmark == "query":
+        return bench_query(args.sizes, args.offset, args.limit)
+    elif args.benchmark == "startup":
+        return bench_startup(args.budget_ms, args.runs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import os
+import sys
+import mmap
+import struct
+from book import Book
+
+# File layout (all integers little-endian):
+#   header   magic "SLIB", version, record count, string count and section offsets
+#   records  one fixed-width row per book holding string ids for every field
+#   offsets  (string count + 1) u64 offsets into the string data
+#   strings  UTF-8 bytes of every distinct title, author, ISBN, URL, path, status and date
+# Version 2 added date_added; version 1 files (six fields per record) are still read.
+MAGIC = b"SLIB"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIQQQ")
+OFFSET = struct.Struct("<Q")
+NO_STRING = 0xFFFFFFFF
+
+BINARY_EXTENSION = ".slib"
+
+FIELDS = ("title", "author", "isbn", "cover_url", "cover_image_path", "status", "date_added")
+FIELDS_BY_VERSION = {1: FIELDS[:6], 2: FIELDS}
+RECORD = struct.Struct(f"<{len(FIELDS)}I")
+
+
+def is_binary_file(path):
+    """Returns True if the file starts with the binary library magic."""
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+def make_book(fields):
+    """Builds a Book from one record's values, in FIELDS order (older versions have fewer)."""
+    if len(fields) < len(FIELDS):
+        fields = list(fields) + [None] * (len(FIELDS) - len(fields))
+    title, author, isbn, cover_url, cover_image_path, status, date_added = fields
+    return Book(title, author, isbn, cover_url, status or "Unread", cover_image_path, date_added)
+
+
+def write_binary(path, books):
+    """Writes books to a binary library file, replacing it atomically."""
+    string_ids = {}
+    strings = []
+    records = bytearray()
+
+    def string_id(value):
+        if value is None:
+            return NO_STRING
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return string_ids[value]
+
+    count = 0
+    for book in books:
+        records += RECORD.pack(*(string_id(getattr(book, field)) for field in FIELDS))
+        count += 1
+
+    offsets = bytearray()
+    position = 0
+    for data in strings:
+        offsets += OFFSET.pack(position)
+        position += len(data)
+    offsets += OFFSET.pack(position)
+
+    records_offset = HEADER.size
+    offsets_offset = records_offset + len(records)
+    strings_offset = offsets_offset + len(offsets)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, count, len(strings), records_offset, offsets_offset, strings_offset))
+        file.write(records)
+        file.write(offsets)
+        for data in strings:
+            file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class BinaryLibrary:
+    """Read-only view of a binary library file through mmap.
+
+    Opening only reads the header; records and strings are decoded when they
+    are accessed, so the operating system pages in just the parts that are used.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self.file.close()
+            raise ValueError(f"{path} is not a binary library file")
+
+        magic, version, _, self.count, self.string_count, self.records_offset, \
+            self.offsets_offset, self.strings_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a binary library file")
+        if version not in FIELDS_BY_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported binary library version {version} in {path}")
+        self.fields = FIELDS_BY_VERSION[version]
+
+        # Zero-copy views over the mapped record and offset arrays (native byte
+        # order, which matches the little-endian layout on every supported platform)
+        self.view = memoryview(self.map)
+        self.records = self.view[self.records_offset:self.offsets_offset].cast("I")
+        self.offsets = self.view[self.offsets_offset:self.strings_offset].cast("Q")
+
+    def string(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        start = self.strings_offset + self.offsets[string_id]
+        end = self.strings_offset + self.offsets[string_id + 1]
+        return str(self.view[start:end], "utf-8")
+
+    def record(self, index):
+        """Returns the fields of one record as a dict, decoding only that row."""
+        width = len(self.fields)
+        ids = self.records[index * width:(index + 1) * width]
+        return {field: self.string(string_id) for field, string_id in zip(self.fields, ids)}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("book index out of range")
+        width = len(self.fields)
+        return make_book([self.string(i) for i in self.records[index * width:(index + 1) * width]])
+
+    def __iter__(self):
+        # Repeated strings (authors, statuses) are decoded once and shared
+        decoded = {}
+        string = self.string
+        records = self.records
+        width = len(self.fields)
+        for index in range(self.count):
+            fields = []
+            for string_id in records[index * width:(index + 1) * width]:
+                value = decoded.get(string_id)
+                if value is None:
+                    value = decoded[string_id] = string(string_id)
+                fields.append(value)
+            yield make_book(fields)
+
+    def close(self):
+        # Views must be released before the mapping can be closed
+        for name in ("records", "offsets", "view"):
+            if hasattr(self, name):
+                getattr(self, name).release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def json_to_binary(json_path, binary_path):
+    """Converts a JSON list file into the binary format."""
+    from json_stream import iter_json_array
+    from storage_engine import book_from_dict
+
+    with open(json_path, "r") as file:
+        write_binary(binary_path, (book_from_dict(record) for record in iter_json_array(file)))
+
+
+def binary_to_json(binary_path, json_path):
+    """Converts a binary list file back into pretty-printed JSON."""
+    from storage_engine import atomic_write_json
+
+    with BinaryLibrary(binary_path) as library:
+        atomic_write_json(json_path, [library.record(index) for index in range(len(library))])
+
+
+def convert_user_directory(user_directory, to_binary=True):
+    """Switches every list in a user's directory to the binary format or back to JSON."""
+    from storage_engine import LIST_NAMES
+
+    for list_name in LIST_NAMES:
+        json_path = os.path.join(user_directory, f"{list_name}.json")
+        binary_path = os.path.join(user_directory, f"{list_name}{BINARY_EXTENSION}")
+        if to_binary:
+            if os.path.exists(json_path):
+                json_to_binary(json_path, binary_path)
+                os.remove(json_path)
+            elif not os.path.exists(binary_path):
+                write_binary(binary_path, [])
+        elif os.path.exists(binary_path):
+            binary_to_json(binary_path, json_path)
+            os.remove(binary_path)
+
+
+if __name__ == "__main__":
+    # Usage: python binary_format.py to-binary|to-json <user directory>...
+    if len(sys.argv) < 3 or sys.argv[1] not in ("to-binary", "to-json"):
+        print("Usage: python binary_format.py to-binary|to-json <user directory>...")
+        sys.exit(1)
+    for directory in sys.argv[2:]:
+        convert_user_directory(directory, sys.argv[1] == "to-binary")
+        print(f"Converted {directory}")
@@ -1,15 +1,59 @@
+import sys
+from datetime import datetime, timezone
+
+# Stored fields of a book, in the order they are written
+FIELDS = ("title", "author", "isbn", "cover_url", "status", "cover_image_path", "date_added")
+
+
+def intern_text(value):
+    # One shared copy of strings that repeat across books, like statuses and author names
+    return sys.intern(value) if type(value) is str else value
+
+
 class Book:
-    def __init__(self, title, author, isbn, cover_url=None, status="Unread", cover_image_path=None):
+    # Slots instead of a per-instance __dict__ keep each book to a fixed, small size.
+    # Status and author go through properties that intern them, so a library holds
+    # one copy of each status and of each author however many books share it.
+    __slots__ = ("title", "_author", "isbn", "cover_url", "_status", "cover_image_path", "date_added")
+
+    def __init__(self, title, author, isbn, cover_url=None, status="Unread", cover_image_path=None,
+                 date_added=None):
         self.title = title
         self.author = author
         self.isbn = isbn
         self.cover_url = cover_url
         self.status = status
         self.cover_image_path = cover_image_path  # Add the cover_image_path attribute
+        self.date_added = date_added  # ISO 8601 UTC time the book was added to its list
+
+    @property
+    def author(self):
+        return self._author
+
+    @author.setter
+    def author(self, author):
+        self._author = intern_text(author)
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        self._status = intern_text(status)
 
     def __repr__(self):
         return f"Book({self.title}, {self.author}, {self.isbn}, {self.cover_url}, {self.status}, {self.cover_image_path})"
 
+    def mark_added(self):
+        # Stamps the time the book was added, unless it already has one (e.g. from an import)
+        if not self.date_added:
+            self.date_added = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def has_pending_cover(self):
+        # A cover URL without a local copy means the download hasn't finished yet
+        return bool(self.cover_url) and not self.cover_image_path
+
     def to_dict(self):
         return {
             "title": self.title,
@@ -17,7 +61,8 @@ class Book:
             "isbn": self.isbn,
             "cover_url": self.cover_url,
             "status": self.status,
-            "cover_image_path": self.cover_image_path  # Include cover_image_path in to_dict
+            "cover_image_path": self.cover_image_path,  # Include cover_image_path in to_dict
+            "date_added": self.date_added
         }
 
     def __eq__(self, other):
@@ -0,0 +1,403 @@
+import re
+import bisect
+import unicodedata
+from book_table import BookTable, load_numpy, date_seconds
+from isbn import canonical_isbn, merge_books
+from library_stats import LibraryStats
+from list_changes import ChangeNotifier, ListChange, ADDED, REMOVED, UPDATED, REORDERED, RESET
+from list_query import STORED_ORDER, RELEVANCE, window
+
+# Sort orders kept as indexes, and how each key is read from a book
+SORT_KEYS = ("title", "author", "status", "date_added")
+LEADING_ARTICLES = ("the ", "a ", "an ")
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def fold_text(text):
+    # Lowercases text and strips accents, so "Élan" and "elan" compare equal
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).casefold()
+
+
+def normalize_sort_key(text, strip_articles=False):
+    # Folds case, accents and punctuation away so "The Élan" sorts as "elan"
+    if not text:
+        return ""
+    text = fold_text(text)
+    text = " ".join(PUNCTUATION.sub("", text).split())
+    if strip_articles:
+        for article in LEADING_ARTICLES:
+            if text.startswith(article):
+                return text[len(article):]
+    return text
+
+
+def sort_key(book, choice):
+    # The normalized key of one book for one sort order
+    if choice == STORED_ORDER:
+        # Only the sequence number counts, which is the order books were added in
+        return ""
+    if choice == "title":
+        return normalize_sort_key(book.title, strip_articles=True)
+    if choice == "date_added":
+        return book.date_added or ""
+    return normalize_sort_key(getattr(book, choice))
+
+
+class BookList(ChangeNotifier):
+    # Shared implementation of Collection and Wishlist.
+    # Books are kept in a dict keyed by ISBN. Dicts remember insertion order, so
+    # the one structure is both the ISBN index and the list order: membership,
+    # lookup, insert and delete are O(1) and iteration order is unchanged.
+    # Keys are canonical ISBNs (isbn.py), so one book can't be added twice
+    # as its ISBN-10 and ISBN-13, or with and without hyphens.
+    # Sort orders are kept as sorted lists of (normalized key, sequence, isbn),
+    # built the first time they are asked for and then updated in place, so
+    # switching between them never sorts again. The sequence number keeps books
+    # with equal keys in the order they were added, and the same structure with an
+    # empty key holds the stored order. For each status a query filters on, the
+    # entries of that status are kept as a sorted subset too, so query() reads a
+    # window of rows after one bisection without touching the rest. Searches go through an
+    # inverted index (search_index.py), also built on first use and kept current.
+    # When numpy is installed, status and author filters and counts run on a
+    # columnar copy of the list (book_table.py), built and maintained the same way.
+    # Counts by status, author and month added (library_stats.py) are kept
+    # current on every change too, so they are never recounted.
+    # Every change is also reported to subscribers as a ListChange (list_changes.py),
+    # after the indexes above are updated, so pages can redraw only what changed.
+    def __init__(self):
+        super().__init__()
+        self.index = {}
+        self.search_index = None
+        self.table = None
+        self.stats = None
+        self.sort_indexes = {}
+        self.sort_entries = {}
+        self.status_indexes = {}
+        self.next_sequence = 0
+
+    @property
+    def books(self):
+        # The books in order, as a list for callers that expect one.
+        return list(self.index.values())
+
+    @books.setter
+    def books(self, books):
+        # Replaces the contents, keeping the first of any duplicate ISBNs.
+        self.index = {}
+        self.search_index = None
+        self.table = None
+        self.stats = None
+        # Subscribers hear of one reset rather than every book being added
+        listeners, self.listeners = self.listeners, []
+        try:
+            self.add_books(books)
+        finally:
+            self.listeners = listeners
+        if self.listeners:
+            self.notify(ListChange(RESET))
+
+    def add_book(self, book):
+        # Adds a book to the list.
+        # Prevents duplicate books based on ISBN.
+        book.isbn = canonical_isbn(book.isbn)
+        if book.isbn in self.index:
+            return False
+        self.index[book.isbn] = book
+        for choice in self.sort_indexes:
+            self.insert_entry(choice, book)
+        if self.search_index is not None:
+            self.search_index.add(book)
+        if self.table is not None:
+            self.table.append(book)
+        if self.stats is not None:
+            self.stats.add(book)
+        if self.listeners:
+            self.notify(ListChange(ADDED, book, len(self.index) - 1))
+        return True
+
+    def add_books(self, books):
+        # Adds many books at once, e.g. while loading from storage.
+        # Returns how many were stored under a different ISBN than they were
+        # given, so lists saved before canonical keys can be re-keyed on disk too.
+        index = self.index
+        added = {}
+        rekeyed = 0
+        for book in books:
+            isbn = canonical_isbn(book.isbn)
+            if isbn != book.isbn:
+                book.isbn = isbn
+                rekeyed += 1
+            if isbn not in index:
+                index[isbn] = added[isbn] = book
+            elif isbn in added:
+                # The same book saved under two forms of its ISBN keeps what both knew
+                merge_books(added[isbn], book)
+        added = list(added.values())
+        if self.search_index is not None:
+            self.search_index.add_books(added)
+        if self.stats is not None:
+            for book in added:
+                self.stats.add(book)
+        if added:
+            # Sorting once is cheaper than inserting each book; indexes rebuild when next used
+            self.clear_sort_indexes()
+            self.table = None
+        if self.listeners and added:
+            with self.batch():
+                for position, book in enumerate(added, len(index) - len(added)):
+                    self.notify(ListChange(ADDED, book, position))
+        return rekeyed
+
+    def key(self, isbn):
+        # The key a book is stored under, for an ISBN written in any form.
+        return isbn if isbn in self.index else canonical_isbn(isbn)
+
+    def remove_book(self, isbn):
+        # Removes a book from the list by its ISBN.
+        isbn = self.key(isbn)
+        position = self.position(isbn) if self.listeners else None
+        book = self.index.pop(isbn, None)
+        if book is not None:
+            for choice in self.sort_indexes:
+                self.remove_entry(choice, isbn, book.status)
+            if self.search_index is not None:
+                self.search_index.remove(isbn)
+            if self.table is not None:
+                self.table.remove(isbn)
+            if self.stats is not None:
+                self.stats.remove(book)
+            if self.listeners:
+                self.notify(ListChange(REMOVED, book, position))
+
+    def set_status(self, isbn, status):
+        # Changes a book's status, keeping the status order up to date.
+        isbn = self.key(isbn)
+        book = self.index.get(isbn)
+        if book is None or book.status == status:
+            return book
+        old_status = book.status
+        if self.stats is not None:
+            self.stats.change_status(old_status, status)
+        if "status" in self.sort_indexes:
+            self.remove_entry("status", isbn, old_status)
+            book.status = status
+            self.insert_entry("status", book)
+        else:
+            book.status = status
+        # The book moves between the status subsets of the other orders; its entry is unchanged
+        for (choice, subset_status), subset in self.status_indexes.items():
+            if choice == "status":
+                continue
+            if subset_status == old_status:
+                del subset[bisect.bisect_left(subset, self.sort_entries[choice][isbn])]
+            elif subset_status == status:
+                bisect.insort(subset, self.sort_entries[choice][isbn])
+        if self.table is not None:
+            self.table.set_status(isbn, status)
+        if self.listeners:
+            self.notify(ListChange(UPDATED, book, old={"status": old_status}))
+        return book
+
+    def set_cover(self, isbn, cover_image_path):
+        # Records where a book's downloaded cover is stored.
+        book = self.index.get(self.key(isbn))
+        if book is None or book.cover_image_path == cover_image_path:
+            return book
+        old_path = book.cover_image_path
+        book.cover_image_path = cover_image_path
+        if self.listeners:
+            self.notify(ListChange(UPDATED, book, old={"cover_image_path": old_path}))
+        return book
+
+    def to_list(self):
+        # Returns the list of books.
+        return list(self.index.values())
+
+    def __iter__(self):
+        # Makes the list iterable.
+        return iter(self.index.values())
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, isbn):
+        return self.key(isbn) in self.index
+
+    def get_book_by_isbn(self, isbn):
+        # Retrieve a book by its ISBN.
+        return self.index.get(self.key(isbn))
+
+    def position(self, isbn):
+        # A book's position in the stored order, or None if it isn't in the list.
+        if isbn not in self.index:
+            return None
+        if STORED_ORDER in self.sort_indexes:
+            return bisect.bisect_left(self.sort_indexes[STORED_ORDER], self.sort_entries[STORED_ORDER][isbn])
+        # Without the stored order index this means walking the list
+        return list(self.index).index(isbn)
+
+    def sort_index(self, choice):
+        # Returns the sorted entries for one key, building them on first use.
+        if choice not in SORT_KEYS and choice != STORED_ORDER:
+            raise ValueError(f"Invalid sort key '{choice}'. Must be one of {list(SORT_KEYS)}.")
+        if choice not in self.sort_indexes:
+            entries = {}
+            for sequence, book in enumerate(self.index.values(), self.next_sequence):
+                entries[book.isbn] = (sort_key(book, choice), sequence, book.isbn)
+            self.next_sequence += len(entries)
+            self.sort_entries[choice] = entries
+            self.sort_indexes[choice] = sorted(entries.values())
+        return self.sort_indexes[choice]
+
+    def insert_entry(self, choice, book):
+        entry = (sort_key(book, choice), self.next_sequence, book.isbn)
+        self.next_sequence += 1
+        self.sort_entries[choice][book.isbn] = entry
+        bisect.insort(self.sort_indexes[choice], entry)
+        subset = self.status_indexes.get((choice, book.status))
+        if subset is not None:
+            bisect.insort(subset, entry)
+
+    def remove_entry(self, choice, isbn, status):
+        entry = self.sort_entries[choice].pop(isbn)
+        entries = self.sort_indexes[choice]
+        del entries[bisect.bisect_left(entries, entry)]
+        subset = self.status_indexes.get((choice, status))
+        if subset is not None:
+            del subset[bisect.bisect_left(subset, entry)]
+
+    def status_index(self, choice, status):
+        # Returns the sorted entries of the books with one status, building them on first use.
+        if (choice, status) not in self.status_indexes:
+            index = self.index
+            self.status_indexes[(choice, status)] = [
+                entry for entry in self.sort_index(choice) if index[entry[2]].status == status
+            ]
+        return self.status_indexes[(choice, status)]
+
+    def clear_sort_indexes(self):
+        self.sort_indexes = {}
+        self.sort_entries = {}
+        self.status_indexes = {}
+
+    def iter_sorted(self, choice="title", alpha=True):
+        # Iterates the books in a sort order without changing the stored order.
+        entries = self.sort_index(choice)
+        index = self.index
+        for _, _, isbn in (entries if alpha else reversed(entries)):
+            yield index[isbn]
+
+    def sorted_books(self, choice="title", alpha=True):
+        # The books in a sort order, ascending if alpha is True.
+        return list(self.iter_sorted(choice, alpha))
+
+    def sort_books(self, alpha, choice="title"):
+        """Reorders the stored list by a given attribute: title, author, status or date_added."""
+        # Kept for stored "reorder" changes; the pages only change how the list is shown
+        self.index = {book.isbn: book for book in self.iter_sorted(choice, alpha)}
+        # The table's rows and the stored order index follow the old order
+        self.table = None
+        self.clear_sort_indexes()
+        if self.listeners:
+            self.notify(ListChange(REORDERED, order=(choice, alpha)))
+
+    def get_table(self):
+        # Returns the columnar table, building it on first use, or None without numpy.
+        if self.table is None:
+            numpy = load_numpy()
+            if numpy is None:
+                return None
+            self.table = BookTable(numpy, self.index.values())
+        return self.table
+
+    def filter_books(self, status=None, author=None, added_after=None, added_before=None, choice=None, alpha=True):
+        # Books meeting every given condition, in a sort order or the stored order.
+        # Dates are ISO 8601 strings; added_before is exclusive. With numpy the
+        # result is a view over the table instead of a list.
+        if status is None and author is None and added_after is None and added_before is None:
+            return list(self.iter_sorted(choice, alpha)) if choice else self.to_list()
+        table = self.get_table()
+        if table is None:
+            books = self.iter_sorted(choice, alpha) if choice else self.index.values()
+            after = date_seconds(added_after) if added_after is not None else None
+            before = date_seconds(added_before) if added_before is not None else None
+            return [
+                book for book in books
+                if (status is None or book.status == status)
+                and (author is None or book.author == author)
+                and (added_after is None or date_seconds(book.date_added) >= after)
+                and (added_before is None or date_seconds(book.date_added) < before)
+            ]
+
+        if choice and choice not in table.orders:
+            table.set_order(choice, (isbn for _, _, isbn in self.sort_index(choice)))
+        mask = table.mask(status, author, added_after, added_before)
+        return table.select(mask, choice or None, alpha)
+
+    def get_stats(self):
+        # Returns the maintained counts, building them on first use.
+        if self.stats is None:
+            self.stats = LibraryStats.build(self.index.values())
+        return self.stats
+
+    def count_by_status(self):
+        # {status: number of books}
+        return dict(self.get_stats().by_status)
+
+    def count_by_author(self):
+        # {author: number of books}
+        return dict(self.get_stats().by_author)
+
+    def query(self, choice=None, alpha=True, status=None, search=None, fuzzy=False, cursor=None, offset=0, limit=50):
+        # One window of the books in a sort order (the stored order if None), optionally
+        # only those with a status and matching a search, as a list_query.BookWindow.
+        # Pass the window's next_cursor back to get the next one; a cursor names the
+        # last row read, so it stays valid while books are added or removed.
+        # Without a search only the rows in the window are read. A search reads its
+        # matches, and without a sort orders them by relevance, ignoring alpha.
+        index = self.index
+        if search and search.strip():
+            scores = self.get_search_index().search(search, fuzzy) or {}
+            isbns = [isbn for isbn in scores if status is None or index[isbn].status == status]
+            if choice:
+                self.sort_index(choice)
+                entries = self.sort_entries[choice]
+                keys = sorted(entries[isbn] for isbn in isbns)
+                ordering = (choice, alpha)
+            else:
+                keys = sorted((-scores[isbn], isbn) for isbn in isbns)
+                ordering = (RELEVANCE, True)
+        else:
+            choice = choice or STORED_ORDER
+            keys = self.status_index(choice, status) if status is not None else self.sort_index(choice)
+            ordering = (choice, alpha)
+        return window(keys, ordering, cursor, offset, limit, lambda key: index[key[-1]])
+
+    def get_search_index(self):
+        # Returns the search index, building it on first use.
+        if self.search_index is None:
+            # Imported here because search_index uses fold_text from this module
+            from search_index import SearchIndex
+            self.search_index = SearchIndex.build(self.index.values())
+        return self.search_index
+
+    def search_books(self, query, choice=None, alpha=True, fuzzy=False):
+        # Books matching every word of the query in their title, author or ISBN.
+        # Words match as prefixes, or also by similar spelling when fuzzy is set.
+        # Results follow the given sort order, or are ranked by relevance without one.
+        if not query or not query.strip():
+            return list(self.iter_sorted(choice, alpha)) if choice else self.to_list()
+
+        scores = self.get_search_index().search(query, fuzzy)
+        if not scores:
+            return []
+        if choice:
+            self.sort_index(choice)
+            entries = self.sort_entries[choice]
+            ordered = sorted((entries[isbn] for isbn in scores), reverse=not alpha)
+            return [self.index[isbn] for _, _, isbn in ordered]
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [self.index[isbn] for isbn in ranked]
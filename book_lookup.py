@@ -0,0 +1,192 @@
+import threading
+from isbn import parse_isbn, canonical_isbn
+
+# Seconds to wait for a metadata API response
+REQUEST_TIMEOUT = 10
+
+_local = threading.local()
+
+
+def get_session():
+    """Returns a requests session for the current thread, reusing its connections."""
+    if not hasattr(_local, "session"):
+        # requests is slow to import, so load it with the first lookup
+        import requests
+        _local.session = requests.Session()
+    return _local.session
+
+
+def fetch_book_data_with_cover(query):
+    """
+    Comprehensive method to fetch book data with cover image from multiple sources.
+    Attempts to retrieve data and cover from both Open Library and Google Books APIs.
+    """
+    # Ensure the query is valid
+    if not query or not isinstance(query, str):
+        return None
+
+    query = query.strip()  # Remove leading/trailing spaces
+
+    # ISBNs are looked up in their canonical 13-digit form, however they were typed
+    isbn = parse_isbn(query)
+    if isbn is not None:
+        query = str(isbn)
+
+    book_data = None
+
+    # First, attempt to fetch data by ISBN
+    if query.isdigit():
+        # Try Open Library first for ISBN
+        book_data = query_open_library(query)
+
+        # If Open Library fails, try Google Books (keeping Open Library's data if it has none)
+        if not book_data or not book_data.get('cover_url'):
+            book_data = query_google_books(query) or book_data
+
+    # If query is not an ISBN (title search)
+    else:
+        # Try Open Library title search first
+        book_data = query_open_library(query)
+
+        # If Open Library fails, try Google Books (keeping Open Library's data if it has none)
+        if not book_data or not book_data.get('cover_url'):
+            book_data = query_google_books(query) or book_data
+
+    # Every source's ISBN is stored in the same form
+    if book_data and book_data.get('isbn'):
+        book_data['isbn'] = canonical_isbn(book_data['isbn'])
+
+    # If still no book data, return None
+    return book_data
+
+
+def query_open_library(query):
+    try:
+        if query.isdigit():
+            # ISBN-specific query
+            url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{query}&format=json&jscmd=data"
+            response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 200:
+                data = response.json()
+                if f"ISBN:{query}" in data:
+                    book_info = data[f"ISBN:{query}"]
+                    cover_urls = [
+                        f"https://covers.openlibrary.org/b/isbn/{query}-L.jpg",
+                        f"https://covers.openlibrary.org/b/isbn/{query}-M.jpg",
+                        f"https://covers.openlibrary.org/b/isbn/{query}-S.jpg"
+                    ]
+
+                    # Find a working cover URL
+                    cover_url = next((url for url in cover_urls if validate_image_url(url)), None)
+
+                    return {
+                        'title': book_info.get('title', 'No Title Available'),
+                        'author': ', '.join(author['name'] for author in book_info.get('authors', [{'name': 'Unknown Author'}])),
+                        'isbn': query,
+                        'cover_url': cover_url
+                    }
+
+        else:
+            # Title search
+            url = f"https://openlibrary.org/search.json?title={query}"
+            response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('docs'):
+                    first_result = data['docs'][0]
+
+                    # Try to find ISBN for cover image, preferring one with a valid checksum
+                    if 'isbn' in first_result and first_result['isbn']:
+                        isbn = next(
+                            (str(isbn) for isbn in map(parse_isbn, first_result['isbn']) if isbn),
+                            first_result['isbn'][0]
+                        )
+                        cover_urls = [
+                            f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg",
+                            f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg",
+                            f"https://covers.openlibrary.org/b/isbn/{isbn}-S.jpg"
+                        ]
+
+                        # Find a working cover URL
+                        cover_url = next((url for url in cover_urls if validate_image_url(url)), None)
+
+                        return {
+                            'title': first_result.get('title', 'No Title Available'),
+                            'author': ', '.join(first_result.get('author_name', ['Unknown Author'])),
+                            'isbn': isbn,
+                            'cover_url': cover_url
+                        }
+    except Exception as e:
+        print(f"Open Library API Error: {e}")
+
+    return None
+
+def query_google_books(query):
+    try:
+        if query.isdigit():
+            url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{query}"
+        else:
+            url = f"https://www.googleapis.com/books/v1/volumes?q=intitle:{query}"
+
+        response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == 200:
+            data = response.json()
+            if "items" in data and len(data["items"]) > 0:
+                volume_info = data["items"][0]["volumeInfo"]
+
+                # Prioritize larger images, replace 'zoom=1' with 'zoom=0' for higher resolution
+                cover_urls = [
+                    volume_info.get('imageLinks', {}).get('extraLarge'),
+                    volume_info.get('imageLinks', {}).get('large'),
+                    volume_info.get('imageLinks', {}).get('medium'),
+                    volume_info.get('imageLinks', {}).get('small'),
+                    volume_info.get('imageLinks', {}).get('thumbnail')
+                ]
+
+                # Remove None values and replace 'zoom=1' with 'zoom=0' for higher resolution
+                cover_urls = [
+                    url.replace('zoom=1', 'zoom=0') if url else None
+                    for url in cover_urls if url
+                ]
+
+                # Find a working cover URL
+                cover_url = next((url for url in cover_urls if validate_image_url(url)), None)
+
+                return {
+                    'title': volume_info.get('title', 'No Title Available'),
+                    'author': ', '.join(volume_info.get('authors', ['Unknown Author'])),
+                    'isbn': google_books_isbn(volume_info.get('industryIdentifiers') or []),
+                    'cover_url': cover_url
+                }
+    except Exception as e:
+        print(f"Google Books API Error: {e}")
+
+    return None
+
+def google_books_isbn(identifiers):
+    """Picks the ISBN-13 from Google Books' identifiers, then the ISBN-10, then whatever is first."""
+    by_type = {identifier.get('type'): identifier.get('identifier') for identifier in identifiers}
+    for identifier_type in ('ISBN_13', 'ISBN_10'):
+        isbn = parse_isbn(by_type.get(identifier_type))
+        if isbn:
+            return str(isbn)
+    return identifiers[0].get('identifier') if identifiers else None
+
+def validate_image_url(url):
+    """
+    Validate that the image URL is accessible and returns a valid image.
+    """
+    if not url:
+        return False
+
+    try:
+        response = get_session().head(url, timeout=5)
+        return (
+            response.status_code == 200 and
+            'image' in response.headers.get('Content-Type', '').lower()
+        )
+    except Exception:
+        return False
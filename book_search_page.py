@@ -1,16 +1,17 @@
 from PyQt5.QtWidgets import QMessageBox, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit, QComboBox, QFrame
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
-import requests
 from book import Book
-from storage import load_collection, save_collection, load_wishlist, save_wishlist, save_image_locally
+from storage import get_cover_downloader
+from book_lookup import fetch_book_data_with_cover, get_session, REQUEST_TIMEOUT
 from scanner import Scanner
 
 class BookSearchPage(QWidget):
-    def __init__(self, user, show_collection_callback, show_wishlist_callback, logout_callback):
+    def __init__(self, user, repository, show_collection_callback, show_wishlist_callback, logout_callback):
         super().__init__()
 
         self.user = user
+        self.repository = repository
         self.show_collection_callback = show_collection_callback
         self.show_wishlist_callback = show_wishlist_callback
         self.logout_callback = logout_callback
@@ -131,159 +132,11 @@ class BookSearchPage(QWidget):
             self.result_layout.addWidget(QLabel("No book found with this query."))
 
     def fetch_book_data_with_cover(self, query):
-        """
-        Comprehensive method to fetch book data with cover image from multiple sources.
-        Attempts to retrieve data and cover from both Open Library and Google Books APIs.
-        """
-        # Ensure the query is valid
+        # Ensure the query is valid; the lookup itself lives in book_lookup.py
         if not query or not isinstance(query, str):
             QMessageBox.warning(self, "Invalid Query", "The query must be a non-empty string.")
             return None
-
-        query = query.strip()  # Remove leading/trailing spaces
-
-        book_data = None
-
-        # First, attempt to fetch data by ISBN
-        if query.isdigit():
-            # Try Open Library first for ISBN
-            book_data = self.query_open_library(query)
-
-            # If Open Library fails, try Google Books
-            if not book_data or not book_data.get('cover_url'):
-                book_data = self.query_google_books(query)
-
-        # If query is not an ISBN (title search)
-        else:
-            # Try Open Library title search first
-            book_data = self.query_open_library(query)
-
-            # If Open Library fails, try Google Books
-            if not book_data or not book_data.get('cover_url'):
-                book_data = self.query_google_books(query)
-
-        # If still no book data, return None
-        return book_data
-
-
-    def query_open_library(self, query):
-        try:
-            if query.isdigit():
-                # ISBN-specific query
-                url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{query}&format=json&jscmd=data"
-                response = requests.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if f"ISBN:{query}" in data:
-                        book_info = data[f"ISBN:{query}"]
-                        cover_urls = [
-                            f"https://covers.openlibrary.org/b/isbn/{query}-L.jpg",
-                            f"https://covers.openlibrary.org/b/isbn/{query}-M.jpg",
-                            f"https://covers.openlibrary.org/b/isbn/{query}-S.jpg"
-                        ]
-                        
-                        # Find a working cover URL
-                        cover_url = next((url for url in cover_urls if self.validate_image_url(url)), None)
-                        
-                        return {
-                            'title': book_info.get('title', 'No Title Available'),
-                            'author': ', '.join(author['name'] for author in book_info.get('authors', [{'name': 'Unknown Author'}])),
-                            'isbn': query,
-                            'cover_url': cover_url
-                        }
-            
-            else:
-                # Title search
-                url = f"https://openlibrary.org/search.json?title={query}"
-                response = requests.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('docs'):
-                        first_result = data['docs'][0]
-                        
-                        # Try to find ISBN for cover image
-                        if 'isbn' in first_result and first_result['isbn']:
-                            isbn = first_result['isbn'][0]
-                            cover_urls = [
-                                f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg",
-                                f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg",
-                                f"https://covers.openlibrary.org/b/isbn/{isbn}-S.jpg"
-                            ]
-                            
-                            # Find a working cover URL
-                            cover_url = next((url for url in cover_urls if self.validate_image_url(url)), None)
-                            
-                            return {
-                                'title': first_result.get('title', 'No Title Available'),
-                                'author': ', '.join(first_result.get('author_name', ['Unknown Author'])),
-                                'isbn': first_result.get('isbn', [''])[0],
-                                'cover_url': cover_url
-                            }
-        except Exception as e:
-            print(f"Open Library API Error: {e}")
-        
-        return None
-
-    def query_google_books(self, query):
-        try:
-            if query.isdigit():
-                url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{query}"
-            else:
-                url = f"https://www.googleapis.com/books/v1/volumes?q=intitle:{query}"
-            
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "items" in data and len(data["items"]) > 0:
-                    volume_info = data["items"][0]["volumeInfo"]
-                    
-                    # Prioritize larger images, replace 'zoom=1' with 'zoom=0' for higher resolution
-                    cover_urls = [
-                        volume_info.get('imageLinks', {}).get('extraLarge'),
-                        volume_info.get('imageLinks', {}).get('large'),
-                        volume_info.get('imageLinks', {}).get('medium'),
-                        volume_info.get('imageLinks', {}).get('small'),
-                        volume_info.get('imageLinks', {}).get('thumbnail')
-                    ]
-                    
-                    # Remove None values and replace 'zoom=1' with 'zoom=0' for higher resolution
-                    cover_urls = [
-                        url.replace('zoom=1', 'zoom=0') if url else None 
-                        for url in cover_urls if url
-                    ]
-                    
-                    # Find a working cover URL
-                    cover_url = next((url for url in cover_urls if self.validate_image_url(url)), None)
-
-                    return {
-                        'title': volume_info.get('title', 'No Title Available'),
-                        'author': ', '.join(volume_info.get('authors', ['Unknown Author'])),
-                        'isbn': volume_info.get('industryIdentifiers')[0].get('identifier'),
-                        'cover_url': cover_url
-                    }
-        except Exception as e:
-            print(f"Google Books API Error: {e}")
-        
-        return None
-
-    def validate_image_url(self, url):
-        """
-        Validate that the image URL is accessible and returns a valid image.
-        """
-        if not url:
-            return False
-        
-        try:
-            response = requests.head(url, timeout=5)
-            return (
-                response.status_code == 200 and 
-                'image' in response.headers.get('Content-Type', '').lower()
-            )
-        except Exception:
-            return False
+        return fetch_book_data_with_cover(query)
 
     def display_book_details(self, book_data):
         self.result_layout.addWidget(QLabel(f"Title: {book_data['title']}"))
@@ -292,7 +145,7 @@ class BookSearchPage(QWidget):
 
         try:
             if book_data['cover_url']:
-                response = requests.get(book_data["cover_url"], stream=True)
+                response = get_session().get(book_data["cover_url"], timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
                     image_data = QPixmap()
                     image_data.loadFromData(response.content)
@@ -322,11 +175,11 @@ class BookSearchPage(QWidget):
         
 
     def add_to_collection(self):
-        # Load the user's current collection
-        collection = load_collection(self.user.username)
+        # Use the user's in-memory collection
+        collection = self.repository.get_collection()
 
         # Check for duplicate book based on ISBN
-        if any(book.isbn == self.book_data['isbn'] for book in collection.books):
+        if collection.get_book_by_isbn(self.book_data['isbn']):
             # Display a pop-up message informing the user about the duplicate
             QMessageBox.warning(
                 self, 
@@ -338,22 +191,10 @@ class BookSearchPage(QWidget):
             return  # Exit the method without adding the book
 
         # If no duplicate is found, proceed with adding the book
-        # Save the cover image locally when adding the book to the collection
-        if self.book_data and 'cover_url' in self.book_data and self.book_data['cover_url']:
-            try:
-                cover_image_path = save_image_locally(self.book_data["cover_url"], self.book_data['isbn'])
-                if cover_image_path:
-                    self.book_data['cover_image_path'] = cover_image_path
-                else:
-                    self.result_layout.addWidget(QLabel("Cover image could not be saved"))
-            except Exception as e:
-                self.result_layout.addWidget(QLabel("Error saving cover image"))
-                print("Error saving image:", e)
-
-        # Filter the book data for saving
+        # The book is saved right away; its cover is downloaded in the background
         book_data_filtered = {
             key: self.book_data[key]
-            for key in ['title', 'author', 'isbn', 'cover_image_path']
+            for key in ['title', 'author', 'isbn', 'cover_url', 'cover_image_path']
             if key in self.book_data
         }
 
@@ -362,17 +203,18 @@ class BookSearchPage(QWidget):
 
         # Create a Book object and add it to the user's collection
         book = Book(**book_data_filtered)
-        collection.add_book(book)
-        save_collection(self.user.username, collection)
+        self.repository.add_book(book, "collection")
+        if book.has_pending_cover():
+            get_cover_downloader().submit(book.cover_url, book.isbn)
 
         QMessageBox.information(self, "Success", "Book added to collection successfully!")
 
     def add_to_wishlist(self):
-        # Load the user's current wishlist
-        wishlist = load_wishlist(self.user.username)
+        # Use the user's in-memory wishlist
+        wishlist = self.repository.get_wishlist()
 
         # Check for duplicate book based on ISBN
-        if any(book.isbn == self.book_data['isbn'] for book in wishlist.books):
+        if wishlist.get_book_by_isbn(self.book_data['isbn']):
             # Display a pop-up message informing the user about the duplicate
             QMessageBox.warning(
                 self, 
@@ -384,22 +226,10 @@ class BookSearchPage(QWidget):
             return  # Exit the method without adding the book
 
         # If no duplicate is found, proceed with adding the book
-        # Save the cover image locally when adding the book to the collection
-        if self.book_data and 'cover_url' in self.book_data and self.book_data['cover_url']:
-            try:
-                cover_image_path = save_image_locally(self.book_data["cover_url"], self.book_data['isbn'])
-                if cover_image_path:
-                    self.book_data['cover_image_path'] = cover_image_path
-                else:
-                    self.result_layout.addWidget(QLabel("Cover image could not be saved"))
-            except Exception as e:
-                self.result_layout.addWidget(QLabel("Error saving cover image"))
-                print("Error saving image:", e)
-
-        # Filter the book data for saving
+        # The book is saved right away; its cover is downloaded in the background
         book_data_filtered = {
             key: self.book_data[key]
-            for key in ['title', 'author', 'isbn', 'cover_image_path']
+            for key in ['title', 'author', 'isbn', 'cover_url', 'cover_image_path']
             if key in self.book_data
         }
 
@@ -408,7 +238,8 @@ class BookSearchPage(QWidget):
 
         # Create a Book object and add it to the user's collection
         book = Book(**book_data_filtered)
-        wishlist.add_book(book)
-        save_wishlist(self.user.username, wishlist)
+        self.repository.add_book(book, "wishlist")
+        if book.has_pending_cover():
+            get_cover_downloader().submit(book.cover_url, book.isbn)
 
         QMessageBox.information(self, "Success", "Book added to wishlist successfully!")
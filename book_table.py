@@ -0,0 +1,195 @@
+from datetime import datetime, timezone
+
+# Codes of the statuses every list uses; any other status gets the next free code
+STATUSES = ("Unread", "In Progress", "Read")
+# Rows are added in blocks so appending one book doesn't copy every column
+MIN_CAPACITY = 1024
+
+
+def load_numpy():
+    """Returns the numpy module, or None if it is not installed."""
+    # Imported on first use: numpy is optional and slow to import
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def date_seconds(date_added):
+    """Returns an ISO 8601 date as seconds since the epoch, or 0 if there is none."""
+    if not date_added:
+        return 0
+    try:
+        date = datetime.fromisoformat(date_added)
+    except ValueError:
+        return 0
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+class TableView:
+    """Read-only sequence of the books in selected rows of a BookTable, in order."""
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TableView(self.table, self.rows[index])
+        return self.table.books[self.rows[index]]
+
+    def __iter__(self):
+        books = self.table.books
+        for row in self.rows.tolist():
+            yield books[row]
+
+    def isbns(self):
+        books = self.table.books
+        return [books[row].isbn for row in self.rows.tolist()]
+
+
+class BookTable:
+    """Columnar copy of a list's books, for filters and counts as NumPy array operations.
+
+    Each book is a row. status and date_added are stored as a code array and
+    epoch seconds, and authors and titles are dictionary-encoded as ids into
+    the authors/titles lists. Sort orders are arrays of rows, from which the
+    rank of every row can be taken. Removed books stay as dead rows until
+    the table is rebuilt; added books are appended, which drops the cached
+    sort orders since the new rows have no place in them yet.
+    """
+
+    def __init__(self, numpy, books):
+        self.np = numpy
+        self.books = list(books)
+        self.rows = {book.isbn: row for row, book in enumerate(self.books)}
+        self.count = len(self.books)
+        self.statuses = list(STATUSES)
+        self.status_codes = {status: code for code, status in enumerate(self.statuses)}
+        self.authors = []
+        self.author_ids = {}
+        self.titles = []
+        self.title_ids = {}
+        self.orders = {}
+
+        np = numpy
+        capacity = max(self.count, MIN_CAPACITY)
+        self.status = np.zeros(capacity, np.uint8)
+        self.author = np.zeros(capacity, np.int32)
+        self.title = np.zeros(capacity, np.int32)
+        self.date_added = np.zeros(capacity, np.int64)
+        self.alive = np.zeros(capacity, np.bool_)
+        count = self.count
+        self.status[:count] = np.fromiter((self.status_code(book.status) for book in self.books), np.uint8, count)
+        self.author[:count] = np.fromiter(
+            (self.encode(book.author, self.authors, self.author_ids) for book in self.books), np.int32, count
+        )
+        self.title[:count] = np.fromiter(
+            (self.encode(book.title, self.titles, self.title_ids) for book in self.books), np.int32, count
+        )
+        self.date_added[:count] = np.fromiter((date_seconds(book.date_added) for book in self.books), np.int64, count)
+        self.alive[:count] = True
+
+    @staticmethod
+    def encode(value, values, ids):
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(values)
+            values.append(value)
+        return value_id
+
+    def status_code(self, status):
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return code
+
+    def append(self, book):
+        if len(self.status) == self.count:
+            for name in ("status", "author", "title", "date_added", "alive"):
+                column = getattr(self, name)
+                grown = self.np.zeros(len(column) * 2, column.dtype)
+                grown[:self.count] = column[:self.count]
+                setattr(self, name, grown)
+        row = self.count
+        self.status[row] = self.status_code(book.status)
+        self.author[row] = self.encode(book.author, self.authors, self.author_ids)
+        self.title[row] = self.encode(book.title, self.titles, self.title_ids)
+        self.date_added[row] = date_seconds(book.date_added)
+        self.alive[row] = True
+        self.books.append(book)
+        self.rows[book.isbn] = row
+        self.count += 1
+        self.orders = {}
+
+    def remove(self, isbn):
+        row = self.rows.pop(isbn, None)
+        if row is not None:
+            self.alive[row] = False
+            self.books[row] = None
+
+    def set_status(self, isbn, status):
+        row = self.rows.get(isbn)
+        if row is not None:
+            self.status[row] = self.status_code(status)
+            self.orders.pop("status", None)
+
+    def set_order(self, choice, isbns):
+        """Stores a sort order given as ISBNs, first to last."""
+        rows = self.rows
+        self.orders[choice] = self.np.fromiter((rows[isbn] for isbn in isbns), self.np.int64, len(rows))
+
+    def ranks(self, choice):
+        """Returns each row's position in a stored sort order."""
+        order = self.orders[choice]
+        ranks = self.np.full(self.count, -1, self.np.int64)
+        ranks[order] = self.np.arange(len(order))
+        return ranks
+
+    def mask(self, status=None, author=None, added_after=None, added_before=None):
+        """Returns a boolean array selecting the live rows that meet every given condition."""
+        np = self.np
+        mask = self.alive[:self.count].copy()
+        if status is not None:
+            if status not in self.status_codes:
+                return np.zeros(self.count, np.bool_)
+            mask &= self.status[:self.count] == self.status_codes[status]
+        if author is not None:
+            if author not in self.author_ids:
+                return np.zeros(self.count, np.bool_)
+            mask &= self.author[:self.count] == self.author_ids[author]
+        if added_after is not None:
+            mask &= self.date_added[:self.count] >= date_seconds(added_after)
+        if added_before is not None:
+            mask &= self.date_added[:self.count] < date_seconds(added_before)
+        return mask
+
+    def select(self, mask, choice=None, alpha=True):
+        """Returns a view of the selected rows, in a stored sort order or in row order."""
+        if choice is None:
+            rows = self.np.flatnonzero(mask)
+        else:
+            order = self.orders[choice]
+            rows = order[mask[order]]
+            if not alpha:
+                rows = rows[::-1]
+        return TableView(self, rows)
+
+    def count_by_status(self, mask=None):
+        """Returns {status: number of books} for the live rows, or the rows a mask selects."""
+        codes = self.status[:self.count][self.alive[:self.count] if mask is None else mask]
+        counts = self.np.bincount(codes, minlength=len(self.statuses))
+        return {status: int(counts[code]) for code, status in enumerate(self.statuses) if counts[code]}
+
+    def count_by_author(self, mask=None):
+        """Returns {author: number of books} for the live rows, or the rows a mask selects."""
+        ids = self.author[:self.count][self.alive[:self.count] if mask is None else mask]
+        counts = self.np.bincount(ids, minlength=len(self.authors))
+        return {self.authors[author_id]: int(counts[author_id]) for author_id in self.np.flatnonzero(counts)}
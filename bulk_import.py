@@ -0,0 +1,234 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from book_lookup import fetch_book_data_with_cover
+from storage_engine import book_from_dict
+from isbn import canonical_isbn
+import storage
+
+MAX_WORKERS = 8
+STATE_FILENAME = "import_state.jsonl"
+PROGRESS_EVERY = 25
+
+# Goodreads exports shelve books by name rather than by reading status
+GOODREADS_SHELVES = {
+    "read": "Read",
+    "currently-reading": "In Progress",
+    "to-read": "Unread",
+}
+STATUSES = ("Unread", "In Progress", "Read")
+
+
+def clean_isbn(value):
+    """Strips the ="..." quoting exports wrap ISBNs in and returns the canonical ISBN."""
+    value = (value or "").strip()
+    if value.startswith("="):
+        value = value[1:]
+    return canonical_isbn(value.strip('"'))
+
+
+def read_import_file(path):
+    """Returns (query, status) pairs from an ISBN list, a CSV or a Goodreads export.
+
+    A query is an ISBN, or the title when a CSV row has none. status is None
+    when the file does not say how far the book has been read.
+    """
+    with open(path, "r", newline="", encoding="utf-8-sig") as file:
+        first_line = file.readline()
+        file.seek(0)
+        if "," not in first_line:
+            # Plain list with one ISBN per line
+            return [(clean_isbn(line), None) for line in file if clean_isbn(line)]
+
+        reader = csv.reader(file)
+        header = [name.strip().lower() for name in next(reader, [])]
+        columns = {name: index for index, name in enumerate(header)}
+        if not any(name in columns for name in ("isbn", "isbn13", "title")):
+            # Headerless CSV: the ISBN is the first column of every row
+            file.seek(0)
+            return [(clean_isbn(row[0]), None) for row in csv.reader(file) if row and clean_isbn(row[0])]
+
+        def column(row, name):
+            index = columns.get(name)
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        entries = []
+        for row in reader:
+            query = clean_isbn(column(row, "isbn13")) or clean_isbn(column(row, "isbn")) or column(row, "title")
+            if not query:
+                continue
+            status = GOODREADS_SHELVES.get(column(row, "exclusive shelf").lower())
+            if status is None and column(row, "status") in STATUSES:
+                status = column(row, "status")
+            entries.append((query, status))
+        return entries
+
+
+class BulkImporter:
+    """Adds many books to one of a user's lists at once.
+
+    Metadata is resolved on a bounded pool of threads and every result is
+    appended to a state file in the user's directory, so an interrupted import
+    picks up where it stopped instead of looking books up again. The list is
+    saved once at the end; covers download in the background meanwhile and are
+    written to the list as they finish.
+    """
+
+    def __init__(self, username, list_name="collection", workers=MAX_WORKERS, progress=print):
+        self.username = username
+        self.list_name = list_name
+        self.workers = workers
+        self.progress = progress
+        self.state_path = os.path.join(storage.get_user_directory(username), f"{list_name}_{STATE_FILENAME}")
+        self.books = {}
+        self.failures = {}
+        self.isbns = set()
+        self.covers = {}
+        self.saved = False
+        self.lock = threading.Lock()
+
+    def load_state(self):
+        """Reads the books resolved by an earlier, interrupted run of this import."""
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, "r") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Skip a line torn by the interruption
+                if entry.get("book"):
+                    book = book_from_dict(entry["book"])
+                    self.books[entry["query"]] = book
+                    self.isbns.add(book.isbn)
+        # Start new entries on a fresh line after a torn one
+        with open(self.state_path, "rb+") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell():
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+
+    def on_cover_ready(self, isbn, path):
+        with self.lock:
+            if not path or isbn not in self.isbns:
+                return
+            self.covers[isbn] = path
+            if self.saved:
+                # The list is already on disk, so record the cover as a change to it
+                storage.schedule_mutation(self.username, ("set_cover", isbn, path), list_name=self.list_name)
+
+    def resolve(self, query, status):
+        book_data = fetch_book_data_with_cover(query)
+        if not book_data or not book_data.get("isbn"):
+            raise LookupError("no book found")
+        book = book_from_dict(book_data)
+        book.status = status or "Unread"
+        book.mark_added()
+        return book
+
+    def run(self, entries):
+        """Imports (query, status) pairs; returns (books added, failures by query)."""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        self.load_state()
+        downloader = storage.get_cover_downloader()
+        downloader.add_listener(self.on_cover_ready)
+
+        # Books already in the list are neither looked up nor added again
+        existing = {book.isbn for book in storage.iter_books(self.username, self.list_name)}
+        pending = {query: status for query, status in entries
+                   if query not in self.books and query not in existing}
+        for book in self.books.values():
+            if book.has_pending_cover():
+                downloader.submit(book.cover_url, book.isbn, block=True)
+
+        total = len(pending)
+        done = 0
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor, open(self.state_path, "a") as state:
+                futures = {executor.submit(self.resolve, query, status): query for query, status in pending.items()}
+                for future in as_completed(futures):
+                    query = futures[future]
+                    try:
+                        book = future.result()
+                    except Exception as e:
+                        self.failures[query] = str(e)
+                        state.write(json.dumps({"query": query, "error": str(e)}) + "\n")
+                    else:
+                        with self.lock:
+                            self.books[query] = book
+                            self.isbns.add(book.isbn)
+                        state.write(json.dumps({"query": query, "book": book.to_dict()}) + "\n")
+                        if book.has_pending_cover():
+                            downloader.submit(book.cover_url, book.isbn, block=True)
+                    state.flush()
+
+                    done += 1
+                    if done % PROGRESS_EVERY == 0 or done == total:
+                        rate = done / max(time.perf_counter() - start, 1e-9)
+                        self.progress(f"[{done}/{total}] {rate:.1f} books/sec, {len(self.failures)} failed")
+
+            added = self.save()
+        finally:
+            if not self.saved:
+                downloader.remove_listener(self.on_cover_ready)
+
+        for query, error in self.failures.items():
+            self.progress(f"Failed {query}: {error}")
+        return added, self.failures
+
+    def save(self):
+        """Adds every resolved book to the list with one write and clears the state file."""
+        storage.flush()
+        engine = storage.get_storage_engine()
+        existing = {book.isbn for book in engine.iter_list(self.username, self.list_name)}
+        with self.lock:
+            books = {}
+            for book in self.books.values():
+                book.isbn = canonical_isbn(book.isbn)
+                if book.isbn in self.covers:
+                    book.cover_image_path = self.covers[book.isbn]
+                if book.isbn not in existing:
+                    books.setdefault(book.isbn, book)
+            # Sent as mutations so the engine takes its own locks, and books other
+            # processes added meanwhile are kept rather than added twice
+            if books:
+                engine.apply_mutations(
+                    self.username, self.list_name, [("add", book.to_dict()) for book in books.values()]
+                )
+            self.saved = True
+        os.remove(self.state_path)
+        return len(books)
+
+    def wait_for_covers(self):
+        """Blocks until the background cover downloads are written to the list."""
+        downloader = storage.get_cover_downloader()
+        downloader.wait()
+        downloader.remove_listener(self.on_cover_ready)
+        storage.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import many books into a user's collection or wishlist.")
+    parser.add_argument("username")
+    parser.add_argument("file", help="ISBN list (one per line), CSV with an ISBN column, or Goodreads export")
+    parser.add_argument("--wishlist", action="store_true", help="import into the wishlist instead of the collection")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="concurrent metadata lookups")
+    args = parser.parse_args()
+
+    if not os.path.isdir(storage.get_user_directory(args.username)):
+        print(f"User '{args.username}' does not exist")
+        sys.exit(1)
+
+    importer = BulkImporter(args.username, "wishlist" if args.wishlist else "collection", args.workers)
+    start = time.perf_counter()
+    added, failures = importer.run(read_import_file(args.file))
+    print(f"Added {added} books in {time.perf_counter() - start:.1f}s, {len(failures)} failed")
+    importer.wait_for_covers()
+    print("Covers downloaded")
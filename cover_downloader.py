@@ -0,0 +1,110 @@
+import queue
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+MAX_WORKERS = 4
+MAX_QUEUE = 512
+PER_HOST_LIMIT = 2
+
+
+class CoverDownloader:
+    """Fetches cover images on a bounded pool of background threads.
+
+    Requests wait in a bounded queue; each worker takes one, limits itself to
+    PER_HOST_LIMIT concurrent requests per cover host, and calls every listener
+    with (isbn, path) when it finishes. path is None if the download failed.
+    Listeners run on the worker thread.
+    """
+
+    def __init__(self, fetch, max_workers=MAX_WORKERS, max_queue=MAX_QUEUE, per_host=PER_HOST_LIMIT):
+        # fetch(url, isbn) returns the local path of the saved cover or None
+        self.fetch = fetch
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.per_host = per_host
+        self.host_limits = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.recent_failures = deque(maxlen=50)
+        self.workers = [
+            threading.Thread(target=self.run, daemon=True, name=f"cover-downloader-{i}")
+            for i in range(max_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def submit(self, url, isbn, block=False):
+        """Queues a cover download; returns False if the queue is full or it is already queued."""
+        with self.lock:
+            if isbn in self.pending:
+                return False
+            self.pending.add(isbn)
+        try:
+            self.queue.put((url, isbn), block=block)
+        except queue.Full:
+            with self.lock:
+                self.pending.discard(isbn)
+            return False
+        return True
+
+    def stats(self):
+        """Returns queue depth, in-flight count and failure counters."""
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "recent_failures": list(self.recent_failures),
+            }
+
+    def wait(self):
+        """Blocks until every queued download has finished."""
+        self.queue.join()
+
+    def host_limit(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    def run(self):
+        while True:
+            url, isbn = self.queue.get()
+            with self.lock:
+                self.in_flight += 1
+            path = None
+            error = None
+            try:
+                with self.host_limit(url):
+                    path = self.fetch(url, isbn)
+            except Exception as e:
+                error = str(e)
+
+            with self.lock:
+                self.in_flight -= 1
+                self.pending.discard(isbn)
+                if path:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                    self.recent_failures.append((isbn, url, error or "download failed"))
+
+            for listener in list(self.listeners):
+                try:
+                    listener(isbn, path)
+                except Exception as e:
+                    print(f"Error notifying cover listener for ISBN {isbn}: {e}")
+            self.queue.task_done()
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import threading
+from io import BytesIO
+from isbn import canonical_isbn
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+def image_extension(data):
+    """Returns the file extension for JPEG/PNG bytes, or None for other formats."""
+    if data.startswith(JPEG_MAGIC):
+        return "jpg"
+    if data.startswith(PNG_MAGIC):
+        return "png"
+    return None
+
+
+class CoverStore:
+    """Stores cover images once per distinct content.
+
+    Images live under objects/<first two hex digits>/<sha256>.<ext>, so identical
+    covers (placeholders, several ISBNs of one edition) share a single file.
+    index.log is an append-only list of ISBN -> object and URL -> object entries,
+    which lets a cover that is already stored be reused without downloading it.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.log")
+        self.by_isbn = {}
+        self.by_url = {}
+        self.lock = threading.Lock()
+        self.load_index()
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Skip a line torn by a crash
+                    if entry.get("isbn"):
+                        # Entries written before ISBNs were canonical are re-keyed as they load
+                        self.by_isbn[canonical_isbn(entry["isbn"])] = entry["object"]
+                    if entry.get("url"):
+                        self.by_url[entry["url"]] = entry["object"]
+        except IOError as e:
+            print(f"Error loading cover index: {e}")
+
+    def object_path(self, name):
+        return os.path.join(self.objects_dir, name[:2], name)
+
+    def lookup(self, isbn=None, url=None):
+        """Returns the path of an already stored cover for the ISBN or URL, if any."""
+        for index, key in ((self.by_isbn, canonical_isbn(isbn)), (self.by_url, url)):
+            name = index.get(key) if key else None
+            if name and os.path.exists(self.object_path(name)):
+                return self.object_path(name)
+        return None
+
+    def save_cover(self, image_url, isbn):
+        """Returns a local path for the cover, downloading it only if it is not stored yet."""
+        with self.lock:
+            path = self.lookup(isbn, image_url)
+            if path:
+                self.record(isbn, image_url, os.path.basename(path))
+                return path
+
+        # Imported here so opening the app doesn't pay for the HTTP stack
+        import requests
+        try:
+            response = requests.get(image_url, timeout=10)
+            response.raise_for_status()
+            data = response.content
+        except requests.RequestException as e:
+            print(f"Error fetching image for ISBN {isbn}: {e}")
+            return None
+
+        try:
+            return self.add(data, isbn, image_url)
+        except IOError as e:
+            print(f"Error saving image locally for ISBN {isbn}: {e}")
+            return None
+
+    def add(self, data, isbn=None, image_url=None):
+        """Stores image bytes and returns their path; JPEG/PNG bytes are kept as they are."""
+        extension = image_extension(data)
+        if extension is None:
+            # Other formats are converted once so every stored cover is a JPEG or PNG
+            from PIL import Image
+            output = BytesIO()
+            Image.open(BytesIO(data)).convert("RGB").save(output, "JPEG")
+            data = output.getvalue()
+            extension = "jpg"
+
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self.object_path(name)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(data)
+                os.replace(temp_path, path)
+            self.record(isbn, image_url, name)
+        return path
+
+    def record(self, isbn, image_url, name):
+        # Must be called with the lock held; only new mappings are appended
+        isbn = canonical_isbn(isbn)
+        entry = {}
+        if isbn and self.by_isbn.get(isbn) != name:
+            self.by_isbn[isbn] = name
+            entry["isbn"] = isbn
+        if image_url and self.by_url.get(image_url) != name:
+            self.by_url[image_url] = name
+            entry["url"] = image_url
+        if entry:
+            entry["object"] = name
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
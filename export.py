@@ -0,0 +1,127 @@
+import os
+import csv
+import sys
+import gzip
+import json
+import argparse
+import storage
+from isbn import parse_isbn
+
+EXPORT_FORMATS = ("csv", "jsonl", "goodreads")
+COLUMNS = ("title", "author", "isbn", "status", "cover_url", "cover_image_path", "date_added")
+
+# Goodreads import columns; the exclusive shelf carries the reading status
+GOODREADS_COLUMNS = ("Title", "Author", "ISBN", "ISBN13", "My Rating", "Exclusive Shelf", "Bookshelves", "Date Added")
+STATUS_SHELVES = {
+    "Read": "read",
+    "In Progress": "currently-reading",
+    "Unread": "to-read",
+}
+
+
+def goodreads_row(book):
+    # Goodreads quotes ISBNs as formulas so spreadsheets keep leading zeros
+    isbn = parse_isbn(book.isbn)
+    raw = book.isbn or ""
+    isbn10 = (isbn.isbn10 or "") if isbn else (raw if len(raw) == 10 else "")
+    isbn13 = str(isbn) if isbn else (raw if len(raw) == 13 else "")
+    shelf = STATUS_SHELVES.get(book.status, "to-read")
+    return [
+        book.title or "",
+        book.author or "",
+        f'="{isbn10}"',
+        f'="{isbn13}"',
+        "0",
+        shelf,
+        shelf,
+        # Goodreads writes dates as YYYY/MM/DD
+        (book.date_added or "")[:10].replace("-", "/"),
+    ]
+
+
+def export_books(books, file, export_format="csv", columns=None):
+    """Writes books to an open text file one record at a time; returns the number written.
+
+    columns selects and orders the fields of CSV and JSONL output. The Goodreads
+    format always has the columns Goodreads expects.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid export format '{export_format}'. Must be one of {list(EXPORT_FORMATS)}.")
+    columns = list(columns or COLUMNS)
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Invalid columns {unknown}. Must be among {list(COLUMNS)}.")
+
+    count = 0
+    if export_format == "jsonl":
+        for book in books:
+            file.write(json.dumps({column: getattr(book, column) for column in columns}) + "\n")
+            count += 1
+    elif export_format == "goodreads":
+        writer = csv.writer(file)
+        writer.writerow(GOODREADS_COLUMNS)
+        for book in books:
+            writer.writerow(goodreads_row(book))
+            count += 1
+    else:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for book in books:
+            writer.writerow(["" if getattr(book, column) is None else getattr(book, column) for column in columns])
+            count += 1
+    return count
+
+
+def open_export_file(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export_list(username, path, list_name="collection", export_format=None, columns=None, compress=None):
+    """Streams one of the user's lists to a file; returns the number of books written.
+
+    The format defaults to the file extension (.csv or .jsonl) and the output is
+    gzip-compressed when compress is set or the path ends in .gz. The file is
+    replaced only once the export is complete.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if compress is None:
+        compress = path.endswith(".gz")
+    if export_format is None:
+        export_format = "jsonl" if name.endswith(".jsonl") else "csv"
+
+    temp_path = f"{path}.tmp"
+    try:
+        with open_export_file(temp_path, compress) as file:
+            # Read errors propagate, so a failed read leaves no partial export behind
+            books = storage.get_storage_engine().iter_list(username, list_name)
+            count = export_books(books, file, export_format, columns)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a user's collection or wishlist.")
+    parser.add_argument("username")
+    parser.add_argument("output", help="output file; .jsonl selects JSONL and a .gz suffix compresses it")
+    parser.add_argument("--wishlist", action="store_true", help="export the wishlist instead of the collection")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="csv, jsonl or goodreads (default: from extension)")
+    parser.add_argument("--columns", nargs="+", choices=COLUMNS, help="fields to include, in order")
+    parser.add_argument("--gzip", action="store_true", default=None, help="compress the output")
+    args = parser.parse_args()
+
+    if not os.path.isdir(storage.get_user_directory(args.username)):
+        print(f"User '{args.username}' does not exist")
+        sys.exit(1)
+
+    list_name = "wishlist" if args.wishlist else "collection"
+    try:
+        count = export_list(args.username, args.output, list_name, args.format, args.columns, args.gzip)
+    except (ValueError, IOError) as e:
+        print(f"Error exporting {list_name} for user {args.username}: {e}")
+        sys.exit(1)
+    print(f"Exported {count} books from {args.username}'s {list_name} to {args.output}")
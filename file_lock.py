@@ -0,0 +1,108 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has byte-range locks in msvcrt instead
+    fcntl = None
+    import msvcrt
+
+# msvcrt locks are mandatory, so lock a byte past the data readers need
+WINDOWS_LOCK_OFFSET = 1024
+
+
+def lock_file(file, blocking=True):
+    """Takes an exclusive advisory lock on an open file; returns False if it is held elsewhere."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    file.seek(WINDOWS_LOCK_OFFSET)
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            threading.Event().wait(0.001)
+
+
+def unlock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(WINDOWS_LOCK_OFFSET)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every ShelfLife process.
+
+    Threads of one process queue on an RLock first, so the lock is re-entrant
+    and only the outermost acquire locks the file. It is meant to be held only
+    for the few milliseconds a write takes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.owner = None
+        self.file = None
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, "a+b")
+                lock_file(self.file)
+            except Exception:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                self.thread_lock.release()
+                raise
+            self.owner = threading.get_ident()
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+            try:
+                unlock_file(self.file)
+            finally:
+                self.file.close()
+                self.file = None
+        self.thread_lock.release()
+
+    def held_by_current_thread(self):
+        return self.owner == threading.get_ident()
+
+    def is_held_elsewhere(self):
+        """Returns True if another process (or thread) holds the lock right now."""
+        if self.held_by_current_thread():
+            return False
+        try:
+            with open(self.path, "a+b") as file:
+                if not lock_file(file, blocking=False):
+                    return True
+                unlock_file(file)
+                return False
+        except IOError:
+            return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,174 @@
+import sys
+
+# Characters people and scanners put between the digits of an ISBN
+SEPARATORS = str.maketrans("", "", " -‐‑‒–")
+
+
+def isbn10_check_digit(digits):
+    """Returns the check character for the first nine digits of an ISBN-10."""
+    remainder = sum((10 - i) * int(digit) for i, digit in enumerate(digits[:9])) % 11
+    return "X" if remainder == 1 else str((11 - remainder) % 11)
+
+
+def isbn13_check_digit(digits):
+    """Returns the check digit for the first twelve digits of an ISBN-13."""
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def clean_isbn(value):
+    """Removes separators and upper-cases a trailing x, without validating anything."""
+    value = str(value).strip().translate(SEPARATORS)
+    return value[:-1] + "X" if value.endswith("x") else value
+
+
+def is_valid_isbn10(value):
+    return len(value) == 10 and value[:9].isdigit() and \
+        (value[9].isdigit() or value[9] == "X") and value[9] == isbn10_check_digit(value)
+
+
+def is_valid_isbn13(value):
+    return len(value) == 13 and value.isdigit() and value[12] == isbn13_check_digit(value)
+
+
+def isbn10_to_isbn13(value):
+    digits = "978" + value[:9]
+    return digits + isbn13_check_digit(digits)
+
+
+def isbn13_to_isbn10(value):
+    """Returns the ISBN-10 of a 978 ISBN-13, or None since 979 ISBNs have no ISBN-10."""
+    if not value.startswith("978"):
+        return None
+    digits = value[3:12]
+    return digits + isbn10_check_digit(digits)
+
+
+class ISBN(str):
+    """A validated ISBN, always held as its 13-digit form.
+
+    ISBN("0-306-40615-2") == ISBN("9780306406157") == "9780306406157", so one
+    book has one key however its ISBN was written. Raises ValueError if the
+    value is not a valid ISBN-10 or ISBN-13.
+    """
+    __slots__ = ()
+
+    def __new__(cls, value):
+        if isinstance(value, ISBN):
+            return value
+        cleaned = clean_isbn(value)
+        if is_valid_isbn13(cleaned):
+            return super().__new__(cls, cleaned)
+        if is_valid_isbn10(cleaned):
+            return super().__new__(cls, isbn10_to_isbn13(cleaned))
+        raise ValueError(f"'{value}' is not a valid ISBN")
+
+    @property
+    def isbn13(self):
+        return str(self)
+
+    @property
+    def isbn10(self):
+        return isbn13_to_isbn10(self)
+
+
+def parse_isbn(value):
+    """Returns the ISBN for a value, or None if it is not a valid ISBN."""
+    if not value:
+        return None
+    try:
+        return ISBN(value)
+    except ValueError:
+        return None
+
+
+def canonical_isbn(value):
+    """Returns the key to store a book under: its ISBN-13, or the cleaned value if it isn't a valid ISBN."""
+    if not value:
+        return value
+    # Keys that are already canonical are by far the most common case. Thirteen digits
+    # come back unchanged whether or not their checksum holds, so it isn't computed.
+    if type(value) is str and len(value) == 13 and value.isdigit():
+        return value
+    isbn = parse_isbn(value)
+    return str(isbn) if isbn is not None else clean_isbn(value)
+
+
+def merge_books(kept, duplicate):
+    """Fills in what a book is missing from a duplicate of it under another ISBN form."""
+    for field in ("cover_url", "cover_image_path", "date_added"):
+        if not getattr(kept, field) and getattr(duplicate, field):
+            setattr(kept, field, getattr(duplicate, field))
+    # Reading progress is not lost to an unread duplicate
+    if kept.status == "Unread" and duplicate.status != "Unread":
+        kept.status = duplicate.status
+
+
+def rekey_books(books):
+    """Returns books under their canonical ISBNs with duplicates merged, and how many changed."""
+    rekeyed = {}
+    changed = 0
+    for book in books:
+        key = canonical_isbn(book.isbn)
+        if key != book.isbn:
+            book.isbn = key
+            changed += 1
+        if key in rekeyed:
+            merge_books(rekeyed[key], book)
+            changed += 1
+        else:
+            rekeyed[key] = book
+    return list(rekeyed.values()), changed
+
+
+def migrate_list(username, list_name, engine=None):
+    """Re-keys one stored list by canonical ISBN; returns the number of books changed."""
+    import storage
+
+    engine = engine or storage.get_storage_engine()
+    # Re-key without the lock, so a list with nothing to change never waits for it
+    signature = engine.signature(username, list_name)
+    books, changed = rekey_books(engine.load_list(username, list_name))
+    if not changed:
+        return 0
+    with engine.writing(username, list_name):
+        if engine.signature(username, list_name) != signature:
+            # Changed while it was read; re-key what is stored now
+            books, changed = rekey_books(engine.load_list(username, list_name))
+        if changed:
+            # save_list doesn't wait on anything that needs this lock, so saving under it is safe
+            engine.save_list(username, list_name, books)
+    return changed
+
+
+def migrate_user_lists(username, engine=None):
+    """Re-keys a user's stored lists by canonical ISBN; returns the number of books changed."""
+    from storage_engine import LIST_NAMES
+
+    return sum(migrate_list(username, list_name, engine) for list_name in LIST_NAMES)
+
+
+if __name__ == "__main__":
+    # Usage: python isbn.py migrate [user_data directory] -- re-keys every user's lists
+    #        python isbn.py <isbn>... -- prints the canonical form of each ISBN
+    if len(sys.argv) < 2:
+        print("Usage: python isbn.py migrate [user_data directory] | python isbn.py <isbn>...")
+        sys.exit(1)
+    if sys.argv[1] == "migrate":
+        import storage
+        from user_registry import list_users
+
+        if len(sys.argv) > 2:
+            storage.set_base_dir(sys.argv[2])
+        storage.flush()
+        total = 0
+        for username, _ in list_users(storage.get_base_dir()):
+            changed = migrate_user_lists(username)
+            total += changed
+            if changed:
+                print(f"{username}: re-keyed {changed} books")
+        print(f"Re-keyed {total} books")
+    else:
+        for value in sys.argv[1:]:
+            isbn = parse_isbn(value)
+            print(f"{value}: {f'{isbn} (ISBN-10 {isbn.isbn10})' if isbn else 'not a valid ISBN'}")
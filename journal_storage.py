@@ -0,0 +1,216 @@
+import os
+import json
+import threading
+from collection import Collection
+from storage_engine import JSONStorageEngine, apply_mutation, file_signature
+
+# Compact a list's journal into a new snapshot once it grows past this many bytes
+COMPACT_THRESHOLD = 256 * 1024
+
+
+class JournalStorageEngine(JSONStorageEngine):
+    """JSON snapshots plus an append-only journal of mutations.
+
+    Each mutation is appended to <list>.log as one JSON line, so a change costs the
+    same no matter how large the list is. Loading reads the snapshot and replays the
+    journal on top of it. When the journal passes the compaction threshold it is
+    rotated to <list>.log.compacting and folded into a new snapshot in the background.
+    """
+    name = "journal"
+
+    def __init__(self, user_directory, compact_threshold=COMPACT_THRESHOLD, fsync=True):
+        super().__init__(user_directory)
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.compactions = {}
+
+    def log_path(self, username, list_name):
+        return os.path.join(self.user_directory(username), f"{list_name}.log")
+
+    def compacting_path(self, username, list_name):
+        return f"{self.log_path(username, list_name)}.compacting"
+
+    def signature(self, username, list_name):
+        return (self.version(username, list_name),) + tuple(
+            file_signature(path) for path in (
+                self.list_path(username, list_name),
+                self.compacting_path(username, list_name),
+                self.log_path(username, list_name)
+            )
+        )
+
+    def read_journal(self, path, repair=False):
+        """Returns the complete records in a journal file.
+
+        A record only counts once its trailing newline is on disk, so a write torn by a
+        crash is ignored. With repair=True the torn tail is truncated away as well.
+        """
+        if not os.path.exists(path):
+            return []
+
+        records = []
+        valid_length = 0
+        with open(path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_length += len(line)
+
+        if repair and valid_length < os.path.getsize(path):
+            print(f"Discarding torn journal tail in {path}")
+            with open(path, "r+b") as file:
+                file.truncate(valid_length)
+        return records
+
+    def repair_tail(self, path):
+        """Truncates a torn last record so the next one starts on its own line.
+
+        A journal ending in a newline has no torn record, so usually only its
+        last byte is read; otherwise it is read backwards to the last newline.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "r+b") as file:
+            end = file.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            file.seek(end - 1)
+            if file.read(1) == b"\n":
+                return
+            # Search backwards for the newline that ends the last complete record
+            position = end
+            while position > 0:
+                start = max(position - 65536, 0)
+                file.seek(start)
+                newline = file.read(position - start).rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            print(f"Discarding torn journal tail in {path}")
+            file.truncate(position)
+
+    def load_snapshot(self, username, list_name):
+        try:
+            return list(super().iter_list(username, list_name))
+        except (ValueError, IOError) as e:
+            print(f"Error loading {list_name} for user {username}: {e}")
+            return []
+
+    def load_list(self, username, list_name):
+        # Readers don't take the lock: a load that overlapped a write (the version
+        # moved while reading) is simply read again
+        while True:
+            version = self.version(username, list_name)
+            # Stored snapshots are already free of duplicates, so skip add_book's per-book check
+            collection = Collection()
+            collection.books = self.load_snapshot(username, list_name)
+            for path in (self.compacting_path(username, list_name), self.log_path(username, list_name)):
+                for record in self.read_journal(path):
+                    apply_mutation(collection, record)
+            if self.version(username, list_name) == version:
+                return collection.books
+
+    def iter_list(self, username, list_name):
+        # Only a snapshot without pending journal records can be streamed as-is
+        if os.path.exists(self.compacting_path(username, list_name)) or \
+                os.path.exists(self.log_path(username, list_name)):
+            return iter(self.load_list(username, list_name))
+        return super().iter_list(username, list_name)
+
+    def save_list(self, username, list_name, books):
+        # A full save becomes the new snapshot and makes any journal obsolete. A caller
+        # already holding the lock can't wait for compaction, which needs the lock too;
+        # it removes the rotated journal instead, so compaction finds nothing left to do
+        if not self.lock_for(username, list_name).held_by_current_thread():
+            self.wait_for_compaction(username, list_name)
+        with self.writing(username, list_name):
+            user_directory = self.user_directory(username)
+            if not os.path.exists(user_directory):
+                os.makedirs(user_directory)
+            self.write_snapshot(username, list_name, books)
+            for path in (self.compacting_path(username, list_name), self.log_path(username, list_name)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def apply_mutations(self, username, list_name, mutations):
+        data = "".join(json.dumps(mutation, separators=(",", ":")) + "\n" for mutation in mutations)
+
+        with self.writing(username, list_name):
+            user_directory = self.user_directory(username)
+            if not os.path.exists(user_directory):
+                os.makedirs(user_directory)
+            log_path = self.log_path(username, list_name)
+            self.repair_tail(log_path)
+            with open(log_path, "a") as file:
+                file.write(data)
+                file.flush()
+                if self.fsync:
+                    os.fsync(file.fileno())
+                log_size = file.tell()
+
+            if log_size >= self.compact_threshold:
+                self.start_compaction(username, list_name)
+
+    def start_compaction(self, username, list_name):
+        """Rotates the journal and folds it into a new snapshot on a background thread."""
+        with self.writing(username, list_name):
+            key = (username, list_name)
+            if key in self.compactions and self.compactions[key].is_alive():
+                return
+            compacting_path = self.compacting_path(username, list_name)
+            if os.path.exists(compacting_path):
+                # A previous compaction was interrupted; fold its journal in first
+                self.compact(username, list_name)
+            os.replace(self.log_path(username, list_name), compacting_path)
+            thread = threading.Thread(target=self.compact, args=(username, list_name), daemon=True)
+            self.compactions[key] = thread
+            thread.start()
+
+    def compact(self, username, list_name):
+        # Replaying is idempotent, so a crash between the snapshot rename and the
+        # journal removal only means the rotated records are replayed once more
+        compacting_path = self.compacting_path(username, list_name)
+        inputs = (file_signature(self.list_path(username, list_name)), file_signature(compacting_path))
+        books = self.fold_journal(username, list_name)
+
+        # Swap the snapshot in under the lock so readers never see it without its journal
+        with self.writing(username, list_name):
+            if not os.path.exists(compacting_path):
+                return  # Another process already compacted it
+            if (file_signature(self.list_path(username, list_name)), file_signature(compacting_path)) != inputs:
+                books = self.fold_journal(username, list_name)
+            try:
+                self.write_snapshot(username, list_name, books)
+                os.remove(compacting_path)
+            except IOError as e:
+                print(f"Error compacting {list_name} for user {username}: {e}")
+
+    def fold_journal(self, username, list_name):
+        # Returns the snapshot with the rotated journal replayed on top of it
+        collection = Collection()
+        collection.books = self.load_snapshot(username, list_name)
+        for record in self.read_journal(self.compacting_path(username, list_name)):
+            apply_mutation(collection, record)
+        return collection.books
+
+    def wait_for_compaction(self, username, list_name):
+        thread = self.compactions.get((username, list_name))
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def write_changes(self, username, list_name, mutations, books=None, base=None):
+        # Appending just the changed records is cheaper than a full snapshot, and
+        # never overwrites what other processes appended
+        with self.lock_for(username, list_name):
+            current = base is not None and self.signature(username, list_name) == base
+            self.apply_mutations(username, list_name, mutations)
+            return self.signature(username, list_name) if current else None
+
+    def close(self):
+        for thread in list(self.compactions.values()):
+            thread.join()
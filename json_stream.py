@@ -0,0 +1,72 @@
+import re
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_DELIMITERS = " \t\r\n,]"
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Yields the elements of a top-level JSON array one at a time.
+
+    The file is read in chunks and each element is decoded as soon as it is
+    complete, so the first record is available before the rest of the file has
+    been read and only one element is held in memory at a time.
+    """
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and the separators between elements
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position < len(buffer) or eof:
+                break
+            buffer = file.read(chunk_size)
+            position = 0
+            eof = not buffer
+
+        if position >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+
+        char = buffer[position]
+        if not started:
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            position += 1
+            continue
+        if char == "]":
+            return
+        if char == ",":
+            position += 1
+            continue
+
+        # Decode the next element, reading more data until it is complete
+        while True:
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = file.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            # A bare number or literal is only complete once a delimiter follows it
+            if not eof and not isinstance(element, (dict, list, str)) \
+                    and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                more = file.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            break
+
+        yield element
+        position = end
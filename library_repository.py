@@ -0,0 +1,192 @@
+import threading
+from list_changes import ListChange, ADDED, REMOVED, UPDATED, REORDERED, RESET
+from storage import load_collection, load_wishlist, get_list_signature, schedule_mutation, has_pending_writes, \
+    load_search_index, save_search_index, load_stats, save_stats
+
+LOADERS = {"collection": load_collection, "wishlist": load_wishlist}
+# Mutation queued for each changed field of an updated book
+FIELD_MUTATIONS = {"status": "set_status", "cover_image_path": "set_cover"}
+
+
+def change_mutation(change):
+    """Returns the storage mutation that persists a ListChange, or None if there is none."""
+    if change.kind == ADDED:
+        return ("add", change.book.to_dict())
+    if change.kind == REMOVED:
+        return ("remove", change.isbn)
+    if change.kind == UPDATED:
+        # Lists change one field per update
+        field = next(iter(change.old))
+        return (FIELD_MUTATIONS[field], change.isbn, getattr(change.book, field))
+    if change.kind == REORDERED:
+        return ("reorder",) + change.order
+    # A reset comes from loading the list, which is already stored
+    return None
+
+
+class LibraryRepository:
+    """Keeps the logged-in user's collection and wishlist in memory for the session.
+
+    Each list is loaded once and the live Collection/Wishlist is handed out to every
+    page. A cheap signature check (version counter, inode, size, mtime) detects changes
+    made by someone else and reloads only then. Mutations update the live list and queue
+    the change on storage.py's write-behind queue, so the caller never waits on disk I/O.
+    If another process wrote the list in the meantime, the queued changes are merged
+    into its copy and the live list is reloaded on the next access.
+
+    Changes are queued from the live list's change events, so anything that changes
+    a list through its methods is persisted. Pages subscribe here rather than to a
+    list, so they stay subscribed across reloads and are told of one as a reset.
+    """
+
+    def __init__(self, username):
+        self.username = username
+        self.lists = {}
+        self.signatures = {}
+        # The write-behind worker updates signatures from its own thread
+        self.signatures_lock = threading.Lock()
+        self.sort_orders = {}
+        self.listeners = {}
+
+    def get_list(self, list_name, refresh=True):
+        """Returns the live list, reloading it only if the stored copy changed."""
+        if list_name not in self.lists:
+            self.reload(list_name)
+        elif refresh and not has_pending_writes(self.username, list_name) \
+                and get_list_signature(self.username, list_name) != self.get_signature(list_name):
+            self.reload(list_name)
+        return self.lists[list_name]
+
+    def get_collection(self, refresh=True):
+        return self.get_list("collection", refresh)
+
+    def get_wishlist(self, refresh=True):
+        return self.get_list("wishlist", refresh)
+
+    def reload(self, list_name):
+        # Take the signature first so a change made during the load is caught next time
+        signature = get_list_signature(self.username, list_name)
+        with self.signatures_lock:
+            self.signatures[list_name] = signature
+        books = LOADERS[list_name](self.username)
+        # Reuse the search index already in memory, or the one saved last session
+        previous = self.lists.get(list_name)
+        if previous is not None and previous.search_index is not None:
+            previous.search_index.sync(books.index)
+            books.search_index = previous.search_index
+        else:
+            load_search_index(self.username, list_name, books)
+        # Saved stats are only trusted at login; a list changed by someone else is recounted
+        if previous is None:
+            load_stats(self.username, list_name, books, signature)
+        books.subscribe(lambda changes: self.on_changes(list_name, changes))
+        self.lists[list_name] = books
+        if previous is not None:
+            self.notify(list_name, [ListChange(RESET)])
+
+    def save_search_indexes(self):
+        """Saves the search index of each loaded list so the next login can reuse it."""
+        for list_name, books in self.lists.items():
+            save_search_index(self.username, list_name, books)
+
+    def save_stats(self):
+        """Saves the stats of each loaded list so the next login can show them without counting."""
+        for list_name, books in self.lists.items():
+            # Only a list whose changes are all written matches its stored signature
+            if not has_pending_writes(self.username, list_name):
+                save_stats(self.username, list_name, books, self.get_signature(list_name))
+
+    def get_stats(self, list_name="collection"):
+        """Returns a list's maintained stats (library_stats.LibraryStats)."""
+        return self.get_list(list_name).get_stats()
+
+    def check_stats(self, list_name="collection"):
+        """Recounts a list's books; returns how its maintained stats differ (empty if they agree)."""
+        books = self.get_list(list_name, refresh=False)
+        return books.get_stats().check(books)
+
+    def add_book(self, book, list_name="collection"):
+        """Adds a book to a list; returns False if it is already there."""
+        book.mark_added()
+        return self.get_list(list_name).add_book(book)
+
+    def remove_book(self, isbn, list_name="collection"):
+        self.get_list(list_name).remove_book(isbn)
+
+    def update_book_status(self, isbn, status, list_name="collection"):
+        self.get_list(list_name).set_status(isbn, status)
+
+    def set_cover(self, isbn, cover_image_path):
+        """Records a downloaded cover for the book in every list that holds it."""
+        for list_name in LOADERS:
+            self.get_list(list_name, refresh=False).set_cover(isbn, cover_image_path)
+
+    def batch(self, list_name="collection"):
+        """Returns a context manager that delivers a list's changes to subscribers together."""
+        return self.get_list(list_name).batch()
+
+    def subscribe(self, listener, list_name="collection"):
+        """Calls listener with each batch of ListChanges to a list, across reloads."""
+        listeners = self.listeners.setdefault(list_name, [])
+        if listener not in listeners:
+            listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener, list_name="collection"):
+        if listener in self.listeners.get(list_name, ()):
+            self.listeners[list_name].remove(listener)
+
+    def notify(self, list_name, changes):
+        for listener in list(self.listeners.get(list_name, ())):
+            listener(changes)
+
+    def on_changes(self, list_name, changes):
+        # Persist each change, then pass them on to the pages
+        for change in changes:
+            mutation = change_mutation(change)
+            if mutation is not None:
+                self.queue(list_name, mutation)
+        self.notify(list_name, changes)
+
+    def pending_covers(self):
+        """Returns (cover_url, isbn) for every book whose cover has not been downloaded."""
+        return [
+            (book.cover_url, book.isbn)
+            for list_name in LOADERS
+            for book in self.get_list(list_name)
+            if book.has_pending_cover()
+        ]
+
+    def sort_list(self, alpha, choice="title", list_name="collection"):
+        """Chooses the order a list is shown in; the stored order is left alone."""
+        self.sort_orders[list_name] = (choice, alpha)
+
+    def get_sorted(self, list_name="collection", query=None, refresh=True, fuzzy=False, status=None):
+        """Returns a list's books in its chosen order, optionally filtered by a search query and status."""
+        choice, alpha = self.sort_orders.get(list_name, (None, True))
+        books = self.get_list(list_name, refresh)
+        if query and query.strip():
+            results = books.search_books(query, choice, alpha, fuzzy)
+            return results if status is None else [book for book in results if book.status == status]
+        return books.filter_books(status=status, choice=choice, alpha=alpha)
+
+    def query(self, list_name="collection", query=None, status=None, cursor=None, offset=0, limit=50,
+              refresh=True, fuzzy=False):
+        """Returns one window of a list's books in its chosen order (see BookList.query)."""
+        choice, alpha = self.sort_orders.get(list_name, (None, True))
+        return self.get_list(list_name, refresh).query(choice, alpha, status, query, fuzzy, cursor, offset, limit)
+
+    def queue(self, list_name, mutation):
+        schedule_mutation(
+            self.username, mutation, self.lists[list_name], list_name, self.mark_saved, self.get_signature(list_name)
+        )
+
+    def get_signature(self, list_name):
+        with self.signatures_lock:
+            return self.signatures[list_name]
+
+    def mark_saved(self, list_name, signature):
+        # Our own write changed the signature; remember it so it doesn't trigger a reload.
+        # None means other processes' changes were merged in, so reload to pick them up.
+        with self.signatures_lock:
+            self.signatures[list_name] = signature
@@ -0,0 +1,156 @@
+import json
+import heapq
+
+STATS_VERSION = 1
+# Books without a date added are counted under this month
+UNKNOWN_MONTH = ""
+
+
+def month_added(book):
+    """Returns the YYYY-MM a book was added in, or UNKNOWN_MONTH."""
+    return book.date_added[:7] if book.date_added else UNKNOWN_MONTH
+
+
+def count(counts, key, change):
+    total = counts.get(key, 0) + change
+    if total:
+        counts[key] = total
+    else:
+        del counts[key]
+
+
+class LibraryStats:
+    """Counts of a list's books by status, by author and by month added.
+
+    The counts are changed by add, remove and change_status as the list
+    changes, so showing them never iterates the books. Keys whose count
+    drops to zero are removed, so the counts always equal a fresh recount;
+    check() verifies that against the books. Saved next to the list with
+    the signature of the stored list they were counted from, and read back
+    at login only if the stored list still has that signature.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_status = {}
+        self.by_author = {}
+        self.by_month = {}
+        self.signature = None
+        self.changed = False
+
+    @classmethod
+    def build(cls, books):
+        stats = cls()
+        for book in books:
+            stats.add(book)
+        return stats
+
+    def add(self, book):
+        self.update(book, 1)
+
+    def remove(self, book):
+        self.update(book, -1)
+
+    def update(self, book, change):
+        self.total += change
+        count(self.by_status, book.status, change)
+        count(self.by_author, book.author, change)
+        count(self.by_month, month_added(book), change)
+        self.changed = True
+
+    def change_status(self, old_status, new_status):
+        if old_status != new_status:
+            count(self.by_status, old_status, -1)
+            count(self.by_status, new_status, 1)
+            self.changed = True
+
+    def top_authors(self, limit=10):
+        """Returns the authors with the most books as (author, count), most first."""
+        return heapq.nsmallest(limit, self.by_author.items(), key=lambda item: (-item[1], item[0]))
+
+    def added_over_time(self):
+        """Returns (month, books added that month, running total) from the first month on."""
+        running = self.by_month.get(UNKNOWN_MONTH, 0)
+        months = []
+        for month in sorted(month for month in self.by_month if month != UNKNOWN_MONTH):
+            running += self.by_month[month]
+            months.append((month, self.by_month[month], running))
+        return months
+
+    def check(self, books):
+        """Recounts the books; returns a description of each count that differs (empty if none)."""
+        expected = LibraryStats.build(books)
+        problems = []
+        if self.total != expected.total:
+            problems.append(f"total: {self.total} counted, {expected.total} books")
+        for name in ("by_status", "by_author", "by_month"):
+            counts, recount = getattr(self, name), getattr(expected, name)
+            for key in sorted(set(counts) | set(recount)):
+                if counts.get(key, 0) != recount.get(key, 0):
+                    problems.append(f"{name} {key!r}: {counts.get(key, 0)} counted, {recount.get(key, 0)} books")
+        return problems
+
+    def to_dict(self):
+        return {
+            "version": STATS_VERSION,
+            "total": self.total,
+            "by_status": self.by_status,
+            "by_author": self.by_author,
+            "by_month": self.by_month,
+            "signature": self.signature,
+        }
+
+    def save(self, path):
+        from storage_engine import atomic_write_json
+
+        atomic_write_json(path, self.to_dict(), indent=None)
+        self.changed = False
+
+    @classmethod
+    def load(cls, path):
+        """Reads saved stats; returns None if there are none or they cannot be used."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != STATS_VERSION:
+            return None
+        stats = cls()
+        stats.total = data.get("total", 0)
+        stats.by_status = data.get("by_status", {})
+        stats.by_author = data.get("by_author", {})
+        stats.by_month = data.get("by_month", {})
+        stats.signature = data.get("signature")
+        return stats
+
+
+if __name__ == "__main__":
+    # Usage: python library_stats.py <username> [--repair] -- checks the saved stats of a user's lists
+    import sys
+    import storage
+    from storage_engine import LIST_NAMES
+
+    if len(sys.argv) < 2:
+        print("Usage: python library_stats.py <username> [--repair]")
+        sys.exit(1)
+    username = sys.argv[1]
+    storage.flush()
+    failed = False
+    for list_name in LIST_NAMES:
+        books = storage.get_storage_engine().load_list(username, list_name)
+        stats = LibraryStats.load(storage.get_stats_path(username, list_name))
+        if stats is None:
+            print(f"{list_name}: no saved stats")
+            continue
+        problems = stats.check(books)
+        for problem in problems:
+            print(f"{list_name}: {problem}")
+        if problems and "--repair" in sys.argv[2:]:
+            LibraryStats.build(books).save(storage.get_stats_path(username, list_name))
+            print(f"{list_name}: stats rebuilt")
+        elif problems:
+            failed = True
+        else:
+            print(f"{list_name}: {stats.total} books, stats consistent")
+    sys.exit(1 if failed else 0)
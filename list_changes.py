@@ -0,0 +1,93 @@
+import contextlib
+
+# Kinds of change a list reports
+ADDED = "added"
+REMOVED = "removed"
+UPDATED = "updated"
+REORDERED = "reordered"
+RESET = "reset"
+
+
+class ListChange:
+    """One change to a Collection or Wishlist.
+
+    added and removed carry the book and its position in the stored order.
+    updated carries the book and old, {field: previous value} for each field
+    that changed; the book stays where it was. reordered carries order, the
+    (choice, alpha) the stored order was sorted by. reset means the whole
+    list was replaced and anything derived from it should be rebuilt.
+    """
+    __slots__ = ("kind", "book", "position", "old", "order")
+
+    def __init__(self, kind, book=None, position=None, old=None, order=None):
+        self.kind = kind
+        self.book = book
+        self.position = position
+        self.old = old
+        self.order = order
+
+    @property
+    def isbn(self):
+        return self.book.isbn if self.book is not None else None
+
+    def __repr__(self):
+        details = [repr(self.kind)]
+        if self.book is not None:
+            details.append(f"isbn={self.isbn!r}")
+        if self.position is not None:
+            details.append(f"position={self.position}")
+        if self.old is not None:
+            details.append(f"old={self.old!r}")
+        if self.order is not None:
+            details.append(f"order={self.order!r}")
+        return f"ListChange({', '.join(details)})"
+
+
+class ChangeNotifier:
+    """Delivers ListChanges to subscribers; plain callbacks, so it needs no event loop.
+
+    Each subscriber is called with a list of changes. Outside a batch every
+    change is delivered as soon as it is made; inside `with notifier.batch():`
+    they are collected and delivered together when the outermost batch ends.
+    Lists only build changes when someone is subscribed, so loading and
+    headless use pay nothing for them.
+    """
+
+    def __init__(self):
+        self.listeners = []
+        self.pending_changes = None
+        self.batch_depth = 0
+
+    def subscribe(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    @contextlib.contextmanager
+    def batch(self):
+        if self.batch_depth == 0:
+            self.pending_changes = []
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                changes, self.pending_changes = self.pending_changes, None
+                if changes:
+                    self.deliver(changes)
+
+    def notify(self, change):
+        if self.pending_changes is not None:
+            self.pending_changes.append(change)
+        else:
+            self.deliver([change])
+
+    def deliver(self, changes):
+        # A copy, so a subscriber may unsubscribe while being called
+        for listener in list(self.listeners):
+            listener(changes)
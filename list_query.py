@@ -0,0 +1,73 @@
+import json
+import bisect
+
+# Order of a list's stored books, as a sort index (see BookList.sort_index)
+STORED_ORDER = "stored"
+# Order of search results without a sort, best match first
+RELEVANCE = "relevance"
+
+
+class BookWindow:
+    """One window of a query's results.
+
+    books are the books in the window, in order, and start is the position
+    of the first of them among all total matches. next_cursor asks for the
+    window after this one, or is None if this is the last.
+    """
+    __slots__ = ("books", "total", "start", "next_cursor")
+
+    def __init__(self, books, total, start, next_cursor):
+        self.books = books
+        self.total = total
+        self.start = start
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.books)
+
+    def __iter__(self):
+        return iter(self.books)
+
+    def __repr__(self):
+        return f"BookWindow({self.start}-{self.start + len(self.books)} of {self.total}, next_cursor={self.next_cursor!r})"
+
+
+def encode_cursor(ordering, key):
+    """Returns a cursor string naming the row after which the next window starts."""
+    return json.dumps([ordering[0], ordering[1], list(key)], separators=(",", ":"))
+
+
+def decode_cursor(cursor, ordering):
+    """Returns the row key in a cursor; raises ValueError if it is from a query in another order."""
+    try:
+        choice, alpha, key = json.loads(cursor)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{cursor}' is not a valid cursor")
+    if [choice, alpha] != list(ordering):
+        raise ValueError(f"Cursor is for the {choice} order, not {ordering[0]}.")
+    return tuple(key)
+
+
+def window(keys, ordering, cursor, offset, limit, book_for):
+    """Returns the BookWindow of limit rows after the cursor and offset in sorted row keys.
+
+    Rows are keys in ascending order; ordering is (choice, alpha), and with
+    alpha False they are read from the end. A cursor is the key of a row, so
+    it finds its place by bisection even if rows were added or removed since,
+    and only the rows in the window are read.
+    """
+    if offset < 0 or limit < 0:
+        raise ValueError("offset and limit must not be negative")
+    key = decode_cursor(cursor, ordering) if cursor else None
+    if ordering[1]:
+        start = (bisect.bisect_right(keys, key) if key is not None else 0) + offset
+        rows = keys[start:start + limit]
+        more = start + limit < len(keys)
+    else:
+        end = max((bisect.bisect_left(keys, key) if key is not None else len(keys)) - offset, 0)
+        begin = max(end - limit, 0)
+        rows = keys[begin:end][::-1]
+        start = len(keys) - end
+        more = begin > 0
+    next_cursor = encode_cursor(ordering, rows[-1]) if rows and more else None
+    return BookWindow([book_for(row) for row in rows], len(keys), start, next_cursor)
@@ -1,20 +1,40 @@
 import sys
 import datetime
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFormLayout
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFormLayout, QProgressBar
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from user import User  # Import User model
 from storage import register_user, login_user  # Import storage methods
 
 
+class PasswordWorker(QThread):
+    # Runs a password check or registration off the GUI thread; bcrypt is slow on purpose
+    finished_with_result = pyqtSignal(bool)
+
+    def __init__(self, task, username, password):
+        super().__init__()
+        self.task = task
+        self.username = username
+        self.password = password
+
+    def run(self):
+        try:
+            result = self.task(self.username, self.password)
+        except Exception as e:
+            print(f"Error checking password for {self.username}: {e}")
+            result = False
+        self.finished_with_result.emit(bool(result))
+
+
 class LoginPage(QWidget):
     def __init__(self, parent=None, login_callback=None):
         super().__init__(parent)
         self.login_callback = login_callback
         self.count = 0  # Track login attempts
         self.locked_until = None  # Track when the user can try logging in again
+        self.worker = None  # Password check running in the background, if any
         self.init_ui()
 
     def init_ui(self):
@@ -76,6 +96,7 @@ class LoginPage(QWidget):
             }
         """)
         login_button.clicked.connect(self.login)
+        self.login_button = login_button
 
         register_button = QPushButton("Register")
         register_button.setFont(QFont("BahnSchrift SemiBold", 18))
@@ -93,12 +114,21 @@ class LoginPage(QWidget):
             }
         """)
         register_button.clicked.connect(self.register)
+        self.register_button = register_button
 
         button_layout.addWidget(login_button, alignment=Qt.AlignCenter)
         button_layout.addWidget(register_button, alignment=Qt.AlignCenter)
 
         main_layout.addLayout(button_layout)
 
+        # Busy indicator shown while a password is being checked
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.setFixedSize(250, 8)
+        self.busy_indicator.hide()
+        main_layout.addWidget(self.busy_indicator, alignment=Qt.AlignCenter)
+
         # Error Label
         self.error_label = QLabel("")
         self.error_label.setFont(QFont("BahnSchrift", 12, QFont.Bold))
@@ -108,11 +138,34 @@ class LoginPage(QWidget):
 
         self.setLayout(main_layout)
 
+    def run_password_task(self, task, username, password, on_result):
+        # Hashing takes a noticeable fraction of a second, so keep the window responsive
+        if self.worker is not None:
+            return
+        self.set_busy(True)
+        self.worker = PasswordWorker(task, username, password)
+        self.worker.finished_with_result.connect(on_result)
+        self.worker.finished.connect(self.password_task_done)
+        self.worker.start()
+
+    def password_task_done(self):
+        self.worker = None
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        self.login_button.setEnabled(not busy)
+        self.register_button.setEnabled(not busy)
+        self.busy_indicator.setVisible(busy)
+        if busy:
+            self.error_label.setText("")
+
     def login(self):
         username = self.username_entry.text().strip()
         password = self.password_entry.text().strip()
+        self.run_password_task(login_user, username, password, lambda ok: self.login_finished(username, ok))
 
-        if login_user(username, password):
+    def login_finished(self, username, ok):
+        if ok:
             self.count = 0  # Reset count on success
             user = User(username)
             if self.login_callback:
@@ -129,7 +182,10 @@ class LoginPage(QWidget):
             self.error_label.setText("Username and password cannot be empty")
             return
 
-        if register_user(username, password):
+        self.run_password_task(register_user, username, password, self.register_finished)
+
+    def register_finished(self, ok):
+        if ok:
             self.error_label.setText("Registration successful! Please log in.")
         else:
             self.error_label.setText("Username already exists. Choose a different username.")
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+import threading
+
+SCHEME = "bcrypt"
+# bcrypt's cost is log2 of the work; each extra round doubles the hashing time
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+TARGET_SECONDS = float(os.environ.get("SHELFLIFE_HASH_TARGET", "0.25"))
+
+
+def hash_rounds(hashed_password):
+    """Returns the cost a bcrypt hash was made with ("$2b$12$..." -> 12)."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def calibrate_rounds(target_seconds=TARGET_SECONDS):
+    """Returns the highest cost whose hash takes at most target_seconds on this machine."""
+    # bcrypt is imported where it is used so the login page can appear before it loads
+    import bcrypt
+
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(MIN_ROUNDS))
+    elapsed = time.perf_counter() - start
+
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and elapsed * 2 <= target_seconds:
+        rounds += 1
+        elapsed *= 2
+    return rounds
+
+
+class PasswordHasher:
+    """Hashes and checks passwords at the configured bcrypt cost.
+
+    The cost comes from SHELFLIFE_BCRYPT_ROUNDS if it is set. Otherwise it is
+    calibrated once for TARGET_SECONDS on this machine and remembered in
+    config_path. Records returned by hash() note the scheme and cost used, so
+    hashes made at a lower cost can be upgraded when the user next logs in.
+    """
+
+    def __init__(self, config_path, target_seconds=TARGET_SECONDS):
+        self.config_path = config_path
+        self.target_seconds = target_seconds
+        self.rounds = None
+        self.lock = threading.Lock()
+
+    def get_rounds(self):
+        with self.lock:
+            if self.rounds is None:
+                self.rounds = self.load_rounds()
+            return self.rounds
+
+    def load_rounds(self):
+        if os.environ.get("SHELFLIFE_BCRYPT_ROUNDS"):
+            return int(os.environ["SHELFLIFE_BCRYPT_ROUNDS"])
+        try:
+            with open(self.config_path, "r") as file:
+                return int(json.load(file)["bcrypt_rounds"])
+        except (IOError, ValueError, KeyError, TypeError):
+            pass
+        return self.calibrate()
+
+    def calibrate(self):
+        """Picks the cost for this machine and saves it for later runs."""
+        rounds = calibrate_rounds(self.target_seconds)
+        try:
+            os.makedirs(os.path.dirname(self.config_path) or ".", exist_ok=True)
+            with open(self.config_path, "w") as file:
+                json.dump({"bcrypt_rounds": rounds, "target_seconds": self.target_seconds}, file)
+        except IOError as e:
+            print(f"Error saving password settings: {e}")
+        self.rounds = rounds
+        return rounds
+
+    def hash(self, password):
+        """Returns the record to store for a password."""
+        import bcrypt
+
+        rounds = self.get_rounds()
+        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+        return {"scheme": SCHEME, "rounds": rounds, "password": hashed_password}
+
+    def verify(self, password, record):
+        """Checks a password against a stored record, including ones without parameters."""
+        import bcrypt
+
+        hashed_password = record.get("password")
+        if record.get("scheme", SCHEME) != SCHEME or not hashed_password:
+            return False
+        try:
+            return bcrypt.checkpw(password.encode(), hashed_password.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, record):
+        """Returns True if the record was hashed at a lower cost than the configured one."""
+        rounds = record.get("rounds") or hash_rounds(record.get("password", ""))
+        return rounds is None or rounds < self.get_rounds() or "scheme" not in record
+
+
+if __name__ == "__main__":
+    # Usage: python passwords.py [target seconds] -- prints the bcrypt cost for this machine
+    import bcrypt
+
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else TARGET_SECONDS
+    rounds = calibrate_rounds(target)
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+    print(f"bcrypt cost {rounds}: {(time.perf_counter() - start) * 1000:.0f}ms per hash (target {target * 1000:.0f}ms)")
+    print(f"Use it with SHELFLIFE_BCRYPT_ROUNDS={rounds}")
@@ -1,9 +1,8 @@
 import sys
-import cv2
-from pyzbar.pyzbar import decode
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QMessageBox
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QTimer
+from isbn import ISBN, parse_isbn
 
 class Scanner:
     @staticmethod
@@ -74,6 +73,9 @@ class BarcodeScannerDialog(QDialog):
 
     def init_camera(self):
         try:
+            # OpenCV is slow to import, so load it only when the scanner is opened
+            import cv2
+
             self.capture = cv2.VideoCapture(0)
 
             if not self.capture.isOpened():
@@ -93,6 +95,9 @@ class BarcodeScannerDialog(QDialog):
         if not self.capture:
             return
 
+        import cv2
+        from pyzbar.pyzbar import decode
+
         ret, frame = self.capture.read()
 
         if not ret:
@@ -108,8 +113,8 @@ class BarcodeScannerDialog(QDialog):
                 barcode_data = barcode.data.decode('utf-8')
 
                 if self.validate_isbn(barcode_data):
-                    self.scanned_isbn = barcode_data
-                    self.status_label.setText(f"Scanned ISBN: {barcode_data}")
+                    self.scanned_isbn = str(ISBN(barcode_data))
+                    self.status_label.setText(f"Scanned ISBN: {self.scanned_isbn}")
                     self.accept()
                     return
 
@@ -124,9 +129,8 @@ class BarcodeScannerDialog(QDialog):
         ))
 
     def validate_isbn(self, isbn):
-        isbn = isbn.replace('-', '').replace(' ', '')
-
-        return (len(isbn) == 10 or len(isbn) == 13) and isbn.isdigit()
+        # Checks the length and check digit, so misreads of other barcodes are skipped
+        return parse_isbn(isbn) is not None
 
     def handle_camera_error(self, error_msg):
         QMessageBox.critical(
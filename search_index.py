@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import bisect
+from book_list import fold_text
+from isbn import parse_isbn
+
+TOKEN = re.compile(r"\w+")
+ISBN_QUERY = re.compile(r"[\dXx][\dXx\- ]*")
+
+# How much a token counts towards a book's rank, by the field it came from
+FIELD_WEIGHTS = (("title", 3), ("author", 2))
+ISBN_WEIGHT = 5
+# A term that is a whole word counts this many times more than a prefix of one
+EXACT_BONUS = 2
+
+# Fuzzy search keeps words whose trigram similarity to a query term is at least this
+FUZZY_THRESHOLD = float(os.environ.get("SHELFLIFE_FUZZY_THRESHOLD", "0.3"))
+
+INDEX_VERSION = 1
+# Adding more new tokens than this re-sorts the token list instead of inserting each
+BULK_TOKENS = 64
+
+
+def tokenize(text):
+    """Splits text into case- and accent-folded words."""
+    return TOKEN.findall(fold_text(text)) if text else []
+
+
+def book_tokens(book):
+    """Returns {token: weight} for the title, author and ISBN of a book."""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(book, field)):
+            weights[token] = weights.get(token, 0) + weight
+    if book.isbn:
+        isbn = book.isbn.replace("-", "").lower()
+        weights[isbn] = weights.get(isbn, 0) + ISBN_WEIGHT
+    return weights
+
+
+def trigrams(token):
+    """Returns the character trigrams of a word, padded so its start and end count."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def query_terms(query):
+    """Splits a search query into terms; an ISBN typed with dashes or spaces stays one term."""
+    query = query.strip()
+    if ISBN_QUERY.fullmatch(query):
+        # A complete ISBN-10 finds the book under its canonical ISBN-13
+        isbn = parse_isbn(query)
+        return [str(isbn) if isbn else query.replace("-", "").replace(" ", "").lower()]
+    return tokenize(query)
+
+
+class SearchIndex:
+    """Inverted index from title, author and ISBN tokens to the books that contain them.
+
+    postings maps each token to {isbn: weight}, and tokens keeps every token in
+    sorted order so the tokens starting with a prefix are found by bisection.
+    Every query term matches as a prefix, all terms must match, and results
+    are ranked by the summed weight of their best-matching token per term.
+    documents remembers each book's tokens so it can be removed, and is all
+    that is saved to disk; loading rebuilds postings without re-reading text.
+
+    For fuzzy search, trigram_postings maps each character trigram to the
+    words containing it. A misspelled term finds its candidate words through
+    the trigrams they share, so only words with something in common are
+    scored, never the whole vocabulary or every book.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self.documents = {}
+        self.trigram_postings = {}
+        self.trigram_counts = {}
+        self.changed = False
+
+    @classmethod
+    def build(cls, books):
+        index = cls()
+        index.add_books(books)
+        return index
+
+    def add(self, book):
+        self.add_books([book])
+
+    def add_books(self, books):
+        self.add_documents(
+            (book.isbn, book_tokens(book)) for book in books if book.isbn not in self.documents
+        )
+
+    def add_documents(self, documents):
+        new_tokens = []
+        for isbn, weights in documents:
+            self.documents[isbn] = weights
+            for token, weight in weights.items():
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = {}
+                    new_tokens.append(token)
+                postings[isbn] = weight
+            self.changed = True
+        for token in new_tokens:
+            self.add_trigrams(token)
+        # A few new tokens are inserted in place; many at once are cheaper to sort together
+        if len(new_tokens) <= BULK_TOKENS:
+            for token in new_tokens:
+                bisect.insort(self.tokens, token)
+        else:
+            self.tokens = sorted(self.postings)
+
+    def remove(self, isbn):
+        weights = self.documents.pop(isbn, None)
+        if weights is None:
+            return
+        for token in weights:
+            postings = self.postings[token]
+            del postings[isbn]
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+                self.remove_trigrams(token)
+        self.changed = True
+
+    def add_trigrams(self, token):
+        # ISBNs and other numbers are only matched exactly or by prefix
+        if token.isdigit():
+            return
+        token_trigrams = trigrams(token)
+        self.trigram_counts[token] = len(token_trigrams)
+        for trigram in token_trigrams:
+            self.trigram_postings.setdefault(trigram, set()).add(token)
+
+    def remove_trigrams(self, token):
+        if token.isdigit():
+            return
+        del self.trigram_counts[token]
+        for trigram in trigrams(token):
+            words = self.trigram_postings[trigram]
+            words.discard(token)
+            if not words:
+                del self.trigram_postings[trigram]
+
+    def sync(self, books):
+        """Brings the index up to date with a list's books (ISBN -> Book)."""
+        for isbn in [isbn for isbn in self.documents if isbn not in books]:
+            self.remove(isbn)
+        self.add_books(book for isbn, book in books.items() if isbn not in self.documents)
+
+    def matches(self, term):
+        """Returns {isbn: score} for books with a token starting with term."""
+        scores = {}
+        tokens = self.tokens
+        position = bisect.bisect_left(tokens, term)
+        while position < len(tokens) and tokens[position].startswith(term):
+            token = tokens[position]
+            bonus = EXACT_BONUS if token == term else 1
+            for isbn, weight in self.postings[token].items():
+                score = weight * bonus
+                if score > scores.get(isbn, 0):
+                    scores[isbn] = score
+            position += 1
+        return scores
+
+    def similar_words(self, term, threshold=FUZZY_THRESHOLD):
+        """Returns {word: similarity} for indexed words sharing enough trigrams with term."""
+        term_trigrams = trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for word in self.trigram_postings.get(trigram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        similar = {}
+        counts = self.trigram_counts
+        for word, count in shared.items():
+            # Jaccard similarity of the two trigram sets
+            similarity = count / (len(term_trigrams) + counts[word] - count)
+            if similarity >= threshold:
+                similar[word] = similarity
+        return similar
+
+    def fuzzy_matches(self, term, threshold=FUZZY_THRESHOLD):
+        """Returns {isbn: score} for books with a word like term, including prefix matches."""
+        scores = self.matches(term)
+        for word, similarity in self.similar_words(term, threshold).items():
+            for isbn, weight in self.postings[word].items():
+                score = weight * similarity
+                if score > scores.get(isbn, 0):
+                    scores[isbn] = score
+        return scores
+
+    def search(self, query, fuzzy=False, threshold=FUZZY_THRESHOLD):
+        """Returns {isbn: score} for books matching every term, or None for an empty query.
+
+        With fuzzy set, a term also matches words whose trigram similarity to it
+        is at least threshold, so misspellings still find the book.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return None
+        if fuzzy:
+            term_matches = (self.fuzzy_matches(term, threshold) for term in set(terms))
+        else:
+            term_matches = (self.matches(term) for term in set(terms))
+        results = None
+        # Start from the rarest term so the intersections stay small
+        for term_scores in sorted(term_matches, key=len):
+            if results is None:
+                results = term_scores
+            else:
+                results = {isbn: score + term_scores[isbn] for isbn, score in results.items() if isbn in term_scores}
+            if not results:
+                break
+        return results
+
+    def save(self, path):
+        from storage_engine import atomic_write_json
+
+        atomic_write_json(path, {"version": INDEX_VERSION, "documents": self.documents}, indent=None)
+        self.changed = False
+
+    @classmethod
+    def load(cls, path):
+        """Reads a saved index; returns None if there is none or it cannot be used."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        index = cls()
+        index.add_documents(data.get("documents", {}).items())
+        index.changed = False
+        return index
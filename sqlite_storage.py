@@ -0,0 +1,207 @@
+import os
+import sys
+import sqlite3
+import threading
+from book import Book
+from collection import Collection
+from storage_engine import StorageEngine, JSONStorageEngine, LIST_NAMES, book_from_dict
+from user_registry import list_users
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn TEXT PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    cover_url TEXT,
+    cover_image_path TEXT
+);
+CREATE TABLE IF NOT EXISTS list_entries (
+    username TEXT NOT NULL,
+    list_name TEXT NOT NULL,
+    isbn TEXT NOT NULL REFERENCES books(isbn),
+    status TEXT NOT NULL DEFAULT 'Unread',
+    position INTEGER NOT NULL,
+    date_added TEXT,
+    PRIMARY KEY (username, list_name, isbn)
+);
+CREATE INDEX IF NOT EXISTS idx_list_entries_position ON list_entries(username, list_name, position);
+CREATE INDEX IF NOT EXISTS idx_list_entries_status ON list_entries(username, list_name, status);
+"""
+
+UPSERT_BOOK = """
+INSERT INTO books (isbn, title, author, cover_url, cover_image_path) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(isbn) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    cover_url = COALESCE(excluded.cover_url, books.cover_url),
+    cover_image_path = COALESCE(excluded.cover_image_path, books.cover_image_path)
+"""
+
+
+class SQLiteStorageEngine(StorageEngine):
+    """Stores every user's lists in a single indexed SQLite database."""
+    name = "sqlite"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_directory = os.path.dirname(db_path)
+        if db_directory and not os.path.exists(db_directory):
+            os.makedirs(db_directory)
+
+        # One connection shared between threads, serialized by a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        self.upgrade_schema()
+
+    def upgrade_schema(self):
+        # Databases created before date_added was tracked are missing its column
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(list_entries)")]
+        if "date_added" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE list_entries ADD COLUMN date_added TEXT")
+
+    def signature(self, username, list_name):
+        # data_version changes only when another connection commits, so our own
+        # writes never make a cached list look stale
+        with self.lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_list(self, username, list_name):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT b.title, b.author, b.isbn, b.cover_url, e.status, b.cover_image_path, e.date_added "
+                "FROM list_entries e JOIN books b ON b.isbn = e.isbn "
+                "WHERE e.username = ? AND e.list_name = ? ORDER BY e.position",
+                (username, list_name)
+            ).fetchall()
+        return [Book(*row) for row in rows]
+
+    def iter_list(self, username, list_name):
+        # A separate connection lets the cursor stream rows without holding the lock
+        connection = sqlite3.connect(self.db_path)
+        try:
+            cursor = connection.execute(
+                "SELECT b.title, b.author, b.isbn, b.cover_url, e.status, b.cover_image_path, e.date_added "
+                "FROM list_entries e JOIN books b ON b.isbn = e.isbn "
+                "WHERE e.username = ? AND e.list_name = ? ORDER BY e.position",
+                (username, list_name)
+            )
+            for row in cursor:
+                yield Book(*row)
+        finally:
+            connection.close()
+
+    def save_list(self, username, list_name, books):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM list_entries WHERE username = ? AND list_name = ?",
+                (username, list_name)
+            )
+            self.connection.executemany(
+                UPSERT_BOOK,
+                [(b.isbn, b.title, b.author, b.cover_url, b.cover_image_path) for b in books]
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO list_entries (username, list_name, isbn, status, position, date_added) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(username, list_name, b.isbn, b.status, position, b.date_added) for position, b in enumerate(books)]
+            )
+
+    def apply_mutations(self, username, list_name, mutations):
+        with self.lock, self.connection:
+            for mutation in mutations:
+                self._apply(username, list_name, mutation)
+
+    def _apply(self, username, list_name, mutation):
+        # Each mutation touches only the rows it affects; must be called with the lock held
+        op = mutation[0]
+        if op == "add":
+            book = book_from_dict(mutation[1])
+            self.connection.execute(
+                UPSERT_BOOK, (book.isbn, book.title, book.author, book.cover_url, book.cover_image_path)
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO list_entries (username, list_name, isbn, status, position, date_added) "
+                "SELECT ?, ?, ?, ?, COALESCE(MAX(position), -1) + 1, ? FROM list_entries "
+                "WHERE username = ? AND list_name = ?",
+                (username, list_name, book.isbn, book.status, book.date_added, username, list_name)
+            )
+        elif op == "remove":
+            self.connection.execute(
+                "DELETE FROM list_entries WHERE username = ? AND list_name = ? AND isbn = ?",
+                (username, list_name, mutation[1])
+            )
+        elif op == "set_status":
+            self.connection.execute(
+                "UPDATE list_entries SET status = ? WHERE username = ? AND list_name = ? AND isbn = ?",
+                (mutation[2], username, list_name, mutation[1])
+            )
+        elif op == "set_cover":
+            self.connection.execute(
+                "UPDATE books SET cover_image_path = ? WHERE isbn = ?",
+                (mutation[2], mutation[1])
+            )
+        elif op == "reorder":
+            rows = self.connection.execute(
+                "SELECT b.title, b.author, b.isbn, b.cover_url, e.status, b.cover_image_path, e.date_added "
+                "FROM list_entries e JOIN books b ON b.isbn = e.isbn "
+                "WHERE e.username = ? AND e.list_name = ? ORDER BY e.position",
+                (username, list_name)
+            ).fetchall()
+            collection = Collection()
+            collection.books = [Book(*row) for row in rows]
+            collection.sort_books(mutation[2], mutation[1])
+            self.connection.executemany(
+                "UPDATE list_entries SET position = ? WHERE username = ? AND list_name = ? AND isbn = ?",
+                [(position, username, list_name, b.isbn) for position, b in enumerate(collection)]
+            )
+        else:
+            raise ValueError(f"Unknown mutation '{op}'.")
+
+    def write_changes(self, username, list_name, mutations, books=None, base=None):
+        # Appending/updating just the changed records is cheaper than a full snapshot,
+        # and SQLite's own locking keeps other processes' rows intact
+        with self.lock, self.connection:
+            version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            for mutation in mutations:
+                self._apply(username, list_name, mutation)
+        return version if version == base else None
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def migrate_json_to_sqlite(base_dir, db_path):
+    """Copies every user's JSON collection and wishlist into an SQLite database."""
+    user_directories = dict(list_users(base_dir))
+    json_engine = JSONStorageEngine(user_directories.get)
+    sqlite_engine = SQLiteStorageEngine(db_path)
+    migrated = 0
+
+    try:
+        for username in sorted(user_directories):
+            for list_name in LIST_NAMES:
+                if not os.path.exists(json_engine.list_path(username, list_name)):
+                    continue
+                books = json_engine.load_list(username, list_name)
+                sqlite_engine.save_list(username, list_name, books)
+                migrated += len(books)
+                print(f"Migrated {len(books)} books from {username}/{list_name}.json")
+    finally:
+        sqlite_engine.close()
+
+    return migrated
+
+
+if __name__ == "__main__":
+    # Usage: python sqlite_storage.py [user_data directory] [database path]
+    base_dir = sys.argv[1] if len(sys.argv) > 1 else \
+        os.environ.get("SHELFLIFE_DATA_DIR") or os.path.join(os.getcwd(), "user_data")
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, "shelflife.db")
+    total = migrate_json_to_sqlite(base_dir, db_path)
+    print(f"Migration complete: {total} books written to {db_path}")
@@ -0,0 +1,58 @@
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QScrollArea, QWidget
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt
+
+
+class StatsDialog(QDialog):
+    def __init__(self, list_title, stats, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"{list_title} Stats")
+        self.setMinimumSize(360, 420)
+        self.setStyleSheet("background-color: #EAD2A8; color: black;")
+
+        layout = QVBoxLayout(self)
+
+        # Total and counts by status
+        heading = QLabel(f"{stats.total} books")
+        heading.setFont(QFont("Arial", 14, QFont.Bold))
+        layout.addWidget(heading)
+        for status in ("Unread", "In Progress", "Read"):
+            layout.addWidget(QLabel(f"{status}: {stats.by_status.get(status, 0)}"))
+
+        # Authors and months can be long, so they scroll
+        details = QWidget()
+        details_layout = QVBoxLayout(details)
+        details_layout.addWidget(self.section("Top Authors"))
+        for author, count in stats.top_authors():
+            details_layout.addWidget(QLabel(f"{author or 'Unknown'}: {count}"))
+        details_layout.addWidget(self.section("Added Over Time"))
+        for month, added, running in stats.added_over_time():
+            details_layout.addWidget(QLabel(f"{month}: +{added} ({running} total)"))
+        details_layout.addStretch()
+
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setStyleSheet("border: none;")
+        scroll_area.setWidget(details)
+        layout.addWidget(scroll_area)
+
+        close_button = QPushButton("Close")
+        close_button.setStyleSheet("""
+            QPushButton {
+                background-color: #c87f4a;
+                color: white;
+                border-radius: 5px;
+                padding: 5px;
+            }
+            QPushButton:hover {
+                background-color: #a66a40;
+            }
+        """)
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button, alignment=Qt.AlignRight)
+
+    @staticmethod
+    def section(title):
+        label = QLabel(title)
+        label.setFont(QFont("Arial", 12, QFont.Bold))
+        return label
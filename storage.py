@@ -1,111 +1,383 @@
 import os
 import json
-import bcrypt
-import requests
-from PIL import Image
-from book import Book
-from io import BytesIO
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap
+import time
+import atexit
+import threading
 from collection import Collection
+from wishlist import Wishlist
+from storage_engine import JSONStorageEngine, mutation_isbn, atomic_write_json
+from isbn import parse_isbn, canonical_isbn, migrate_list
+from passwords import PasswordHasher
+from user_registry import UserRegistry, is_user_directory
+from cover_store import CoverStore
+from cover_downloader import CoverDownloader
+from thumbnails import generate_thumbnails
 
-# Set up base directory for user data in the current working directory
-BASE_DIR = os.path.join(os.getcwd(), "user_data")
-if not os.path.exists(BASE_DIR):
-    os.makedirs(BASE_DIR)
+# Directory holding all user data: SHELFLIFE_DATA_DIR, or user_data in the current working
+# directory. It is resolved on first use and only created once something is saved there.
+_base_dir = None
+
+# Storage engine used for collections and wishlists: "json" (default), "journal" or "sqlite"
+STORAGE_ENGINE = os.environ.get("SHELFLIFE_STORAGE", "json")
+_storage_engine = None
+
+# Minimum number of seconds between two background writes of queued changes
+FLUSH_INTERVAL = float(os.environ.get("SHELFLIFE_FLUSH_INTERVAL", "1.0"))
+_write_queue = None
+
+# Keep each list's search index and stats in <list>_search.json and <list>_stats.json so they
+# are not rebuilt at login; "0" disables both
+SEARCH_CACHE = os.environ.get("SHELFLIFE_SEARCH_CACHE", "1") != "0"
+_cover_store = None
+_cover_downloader = None
+_password_hasher = None
+_user_registry = None
+
+def get_base_dir():
+    """Returns the directory where all user data is stored."""
+    global _base_dir
+    if _base_dir is None:
+        _base_dir = os.path.abspath(os.environ.get("SHELFLIFE_DATA_DIR") or os.path.join(os.getcwd(), "user_data"))
+    return _base_dir
+
+def set_base_dir(path):
+    """Points storage at another data directory; call it before any user data is used."""
+    global _base_dir, _user_registry, _cover_store, _password_hasher
+    _base_dir = os.path.abspath(path)
+    _user_registry = _cover_store = _password_hasher = None
+
+def get_user_registry():
+    """Returns the index of every account and where its data is stored."""
+    global _user_registry
+    if _user_registry is None:
+        _user_registry = UserRegistry(get_base_dir())
+    return _user_registry
 
 def get_user_directory(username):
-    """Returns the directory where user data is stored (in user_data folder)."""
-    return os.path.join(BASE_DIR, username)
+    """Returns the directory where user data is stored (user_data/users/<shard>/<username>)."""
+    registry = get_user_registry()
+    if registry.lookup(username) is None:
+        # Accounts from before the sharded layout stay where they are until migrated
+        legacy_directory = os.path.join(get_base_dir(), username)
+        if is_user_directory(legacy_directory):
+            return legacy_directory
+    return registry.user_directory(username)
+
+def register_legacy_user(username):
+    """Adds an account from before the sharded layout to the registry where it is."""
+    registry = get_user_registry()
+    legacy_directory = os.path.join(get_base_dir(), username)
+    if registry.lookup(username) is None and is_user_directory(legacy_directory):
+        registry.register(username, legacy_directory)
+
+def create_storage_engine(name):
+    """Creates a storage engine by name."""
+    if name == "json":
+        return JSONStorageEngine(get_user_directory)
+    if name == "journal":
+        from journal_storage import JournalStorageEngine
+        return JournalStorageEngine(get_user_directory)
+    if name == "sqlite":
+        from sqlite_storage import SQLiteStorageEngine
+        return SQLiteStorageEngine(os.path.join(get_base_dir(), "shelflife.db"))
+    raise ValueError(f"Unknown storage engine '{name}'. Must be one of ['json', 'journal', 'sqlite'].")
+
+def get_storage_engine():
+    """Returns the storage engine in use, creating it on first access."""
+    global _storage_engine
+    if _storage_engine is None:
+        _storage_engine = create_storage_engine(STORAGE_ENGINE)
+    return _storage_engine
+
+def set_storage_engine(engine):
+    """Switches the storage engine, given either an engine instance or its name."""
+    global _storage_engine
+    if isinstance(engine, str):
+        engine = create_storage_engine(engine)
+    if _storage_engine is not None and _storage_engine is not engine:
+        _storage_engine.close()
+    _storage_engine = engine
+
+def iter_books(username, list_name="collection"):
+    """Yields the books in one of the user's lists as they are read from storage."""
+    try:
+        yield from get_storage_engine().iter_list(username, list_name)
+    except (ValueError, IOError) as e:
+        print(f"Error loading {list_name} for user {username}: {e}")
 
 def load_collection(username):
-    """Loads the user's book collection from file."""
-    user_directory = get_user_directory(username)
-    collection_file = os.path.join(user_directory, "collection.json")
-    
-    if not os.path.exists(collection_file):
-        return Collection()  # Return an empty Collection instance
-    
+    """Loads the user's book collection from the configured storage engine."""
+    collection = Collection()
+    if collection.add_books(iter_books(username, "collection")):
+        # Saved before books were keyed by canonical ISBN; store it that way once
+        rekey_stored_list(username, "collection")
+    return collection
+
+def rekey_stored_list(username, list_name):
     try:
-        with open(collection_file, "r") as file:
-            books_data = json.load(file)
-            collection = Collection()
-            for book_data in books_data:
-                collection.add_book(
-                    Book(
-                        title=book_data.get("title"),
-                        author=book_data.get("author"),
-                        isbn=book_data.get("isbn"),
-                        cover_image_path=book_data.get("cover_image_path"),
-                        cover_url=book_data.get("cover_url"),
-                        status=book_data.get("status", "Unread")
-                    )
-                )
-            return collection
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error loading collection for user {username}: {e}")
-        return Collection()
+        migrate_list(username, list_name)
+    except IOError as e:
+        print(f"Error re-keying {list_name} for user {username}: {e}")
 
-def save_collection(username, collection):
-    """Saves the user's book collection to file."""
-    user_directory = get_user_directory(username)
-    
-    if not os.path.exists(user_directory):
-        os.makedirs(user_directory)
-    
-    collection_file = os.path.join(user_directory, "collection.json")
-    books_data = [book.to_dict() for book in collection]
-    
+def save_list(username, list_name, books):
+    """Replaces one of the user's stored lists, printing any error instead of raising it."""
     try:
-        with open(collection_file, "w") as file:
-            json.dump(books_data, file, indent=4)
+        get_storage_engine().save_list(username, list_name, books)
     except IOError as e:
-        print(f"Error saving collection for user {username}: {e}")
+        print(f"Error saving {list_name} for user {username}: {e}")
 
-def load_wishlist(username):
-    """Loads the user's book wishlist from file."""
-    user_directory = get_user_directory(username)
-    collection_file = os.path.join(user_directory, "wishlist.json")
-    
-    if not os.path.exists(collection_file):
-        return Collection()  # Return an empty Collection instance
-    
+def apply_mutations(username, list_name, mutations):
+    """Applies mutations to one of the user's stored lists, printing any error instead of raising it."""
     try:
-        with open(collection_file, "r") as file:
-            books_data = json.load(file)
-            collection = Collection()
-            for book_data in books_data:
-                collection.add_book(
-                    Book(
-                        title=book_data.get("title"),
-                        author=book_data.get("author"),
-                        isbn=book_data.get("isbn"),
-                        cover_image_path=book_data.get("cover_image_path"),
-                        cover_url=book_data.get("cover_url"),
-                        status=book_data.get("status", "Unread")
-                    )
-                )
-            return collection
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error loading wishlist for user {username}: {e}")
-        return
+        get_storage_engine().apply_mutations(username, list_name, mutations)
+    except IOError as e:
+        print(f"Error writing {list_name} for user {username}: {e}")
+
+def save_collection(username, collection):
+    """Saves the user's book collection through the configured storage engine."""
+    save_list(username, "collection", list(collection))
 
+def load_wishlist(username):
+    """Loads the user's book wishlist from the configured storage engine."""
+    wishlist = Wishlist()
+    if wishlist.add_books(iter_books(username, "wishlist")):
+        rekey_stored_list(username, "wishlist")
+    return wishlist
 
 def save_wishlist(username, wishlist):
-    """Saves the user's book wishlist to file."""
-    user_directory = get_user_directory(username)
-    
-    if not os.path.exists(user_directory):
-        os.makedirs(user_directory)
-    
-    collection_file = os.path.join(user_directory, "wishlist.json")
-    books_data = [book.to_dict() for book in wishlist]
-    
+    """Saves the user's book wishlist through the configured storage engine."""
+    save_list(username, "wishlist", list(wishlist))
+
+def get_search_index_path(username, list_name="collection"):
+    return os.path.join(get_user_directory(username), f"{list_name}_search.json")
+
+def load_search_index(username, list_name, books):
+    """Gives a freshly loaded list its saved search index, updated for changes since it was saved."""
+    if not SEARCH_CACHE:
+        return
+    from search_index import SearchIndex
+    index = SearchIndex.load(get_search_index_path(username, list_name))
+    if index is not None:
+        index.sync(books.index)
+        books.search_index = index
+
+def save_search_index(username, list_name, books):
+    """Saves a list's search index if it was built or changed since it was last saved."""
+    index = books.search_index
+    if not SEARCH_CACHE or index is None or not index.changed:
+        return
     try:
-        with open(collection_file, "w") as file:
-            json.dump(books_data, file, indent=4)
+        index.save(get_search_index_path(username, list_name))
     except IOError as e:
-        print(f"Error saving collection for user {username}: {e}")
+        print(f"Error saving the {list_name} search index for user {username}: {e}")
+
+def get_stats_path(username, list_name="collection"):
+    return os.path.join(get_user_directory(username), f"{list_name}_stats.json")
+
+def stats_signature(signature):
+    """Returns a list signature as it reads back from a stats file, or None if it can't be saved."""
+    if signature is None or not get_storage_engine().durable_signatures:
+        return None
+    return json.loads(json.dumps(signature))
+
+def load_stats(username, list_name, books, signature):
+    """Gives a freshly loaded list its saved stats if they were counted from the same stored list.
+
+    signature is that of the stored list the books were loaded from. Stats
+    saved from any other version of the list are ignored and recounted.
+    """
+    signature = stats_signature(signature)
+    if not SEARCH_CACHE or signature is None:
+        return
+    from library_stats import LibraryStats
+    stats = LibraryStats.load(get_stats_path(username, list_name))
+    if stats is not None and stats.signature == signature and stats.total == len(books):
+        books.stats = stats
+
+def save_stats(username, list_name, books, signature):
+    """Saves a list's stats along with the signature of the stored list they match."""
+    stats = books.stats
+    signature = stats_signature(signature)
+    if not SEARCH_CACHE or stats is None or signature is None:
+        return
+    if not stats.changed and stats.signature == signature:
+        return
+    stats.signature = signature
+    try:
+        stats.save(get_stats_path(username, list_name))
+    except IOError as e:
+        print(f"Error saving the {list_name} stats for user {username}: {e}")
+
+def get_list_signature(username, list_name="collection"):
+    """Returns a token that changes whenever one of the user's stored lists changes."""
+    return get_storage_engine().signature(username, list_name)
+
+def add_book_to_list(username, book, list_name="collection"):
+    """Adds a single book to one of the user's lists without rewriting the others."""
+    apply_mutations(username, list_name, [("add", book.to_dict())])
+
+def remove_book_from_list(username, isbn, list_name="collection"):
+    """Removes a single book from one of the user's lists."""
+    apply_mutations(username, list_name, [("remove", isbn)])
+
+def update_book_status(username, isbn, status, list_name="collection"):
+    """Changes the status of a single book in one of the user's lists."""
+    apply_mutations(username, list_name, [("set_status", isbn, status)])
+
+def sort_list(username, alpha, choice="title", list_name="collection"):
+    """Persists a new sort order for one of the user's lists."""
+    apply_mutations(username, list_name, [("reorder", choice, alpha)])
+
+class WriteBehindQueue:
+    """Collects list mutations and writes them from a background thread.
+
+    Mutations mark a user's list dirty and return immediately. The worker waits
+    until the list has been dirty for `interval` seconds, then writes everything
+    queued so far in one go, so a burst of changes costs a single disk write.
+    A write that fails keeps its mutations queued and is retried `interval`
+    seconds later, ahead of anything queued since.
+
+    Changes queued while a list's write is in flight carry the signature the
+    list had before that write. The worker remembers what each write turned
+    that signature into and hands the newer one to the next write instead.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending = {}  # (username, list_name) -> {"mutations": [...], "books": ..., "callbacks": [...], "base": ...}
+        self.dirty_since = None
+        self.flush_requested = False
+        self.in_flight = False
+        self.writes = 0
+        self.rounds = 0
+        self.written = {}  # (username, list_name) -> (base of the last write, signature it left)
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def enqueue(self, username, list_name, mutation, books=None, on_written=None, base=None):
+        """Queues a mutation; `books` is the live list for whole-file engines.
+
+        `base` is the signature of the stored list `books` was loaded from; see
+        StorageEngine.write_changes.
+        """
+        with self.condition:
+            entry = self.pending.setdefault(
+                (username, list_name), {"mutations": [], "books": None, "callbacks": [], "base": base}
+            )
+            coalesce_mutation(entry["mutations"], mutation)
+            if books is not None:
+                entry["books"] = books
+            if on_written is not None and on_written not in entry["callbacks"]:
+                entry["callbacks"].append(on_written)
+            if self.dirty_since is None:
+                self.dirty_since = time.monotonic()
+            self.condition.notify_all()
+
+    def has_pending(self, username, list_name):
+        with self.condition:
+            return (username, list_name) in self.pending
+
+    def flush(self):
+        """Writes everything queued so far and blocks until it is on disk or has failed."""
+        with self.condition:
+            # Wait for the write in progress and then one more for what is queued,
+            # not for retries of writes that keep failing
+            target = self.rounds + self.in_flight + bool(self.pending)
+            if self.pending:
+                self.flush_requested = True
+                self.condition.notify_all()
+            while (self.pending or self.in_flight) and self.rounds < target:
+                self.condition.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                while not self.flush_requested:
+                    remaining = self.dirty_since + self.interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = self.pending
+                self.pending = {}
+                self.dirty_since = None
+                self.flush_requested = False
+                self.in_flight = True
+
+            failed = {}
+            for (username, list_name), entry in batch.items():
+                books = list(entry["books"]) if entry["books"] is not None else None
+                base = entry["base"]
+                last = self.written.get((username, list_name))
+                if last is not None and base is not None and base == last[0]:
+                    # Queued before our previous write's signature reached the caller
+                    base = last[1]
+                try:
+                    signature = get_storage_engine().write_changes(
+                        username, list_name, entry["mutations"], books, base
+                    )
+                    self.written[(username, list_name)] = (base, signature)
+                    self.writes += 1
+                except Exception as e:
+                    print(f"Error writing {list_name} for user {username}, will retry: {e}")
+                    failed[(username, list_name)] = entry
+                    continue
+                for callback in entry["callbacks"]:
+                    callback(list_name, signature)
+
+            with self.condition:
+                for key, entry in failed.items():
+                    self.requeue(key, entry)
+                self.in_flight = False
+                self.rounds += 1
+                self.condition.notify_all()
+
+    def requeue(self, key, entry):
+        # Puts a failed write back in front of whatever was queued for the list since
+        newer = self.pending.get(key)
+        if newer is not None:
+            for mutation in newer["mutations"]:
+                coalesce_mutation(entry["mutations"], mutation)
+            entry["books"] = newer["books"] if newer["books"] is not None else entry["books"]
+            entry["callbacks"] += [callback for callback in newer["callbacks"] if callback not in entry["callbacks"]]
+        self.pending[key] = entry
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+
+def coalesce_mutation(mutations, mutation):
+    """Appends a mutation, dropping an earlier status change it makes redundant."""
+    if mutation[0] == "set_status":
+        for i in range(len(mutations) - 1, -1, -1):
+            earlier = mutations[i]
+            if earlier[0] == "set_status" and earlier[1] == mutation[1]:
+                del mutations[i]
+                break
+            if earlier[0] == "reorder" or mutation_isbn(earlier) == mutation[1]:
+                break
+    mutations.append(mutation)
+
+def get_write_queue():
+    """Returns the write-behind queue, starting its worker on first use."""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteBehindQueue()
+        atexit.register(_write_queue.flush)
+    return _write_queue
+
+def schedule_mutation(username, mutation, books=None, list_name="collection", on_written=None, base=None):
+    """Queues a change to one of the user's lists for a background write."""
+    get_write_queue().enqueue(username, list_name, mutation, books, on_written, base)
+
+def has_pending_writes(username, list_name="collection"):
+    """Returns True if changes to the list are still waiting to be written."""
+    return _write_queue is not None and _write_queue.has_pending(username, list_name)
+
+def flush():
+    """Blocks until every queued change has been written durably."""
+    if _write_queue is not None:
+        _write_queue.flush()
 
 def save_user_data(username, password, collection):
     """Saves the user's username, password (hashed), and collection to user_data folder."""
@@ -116,18 +388,29 @@ def save_user_data(username, password, collection):
     
     try:
         # Save hashed password
-        password_file = os.path.join(user_directory, "password.json")
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-        with open(password_file, "w") as file:
-            json.dump({"password": hashed_password}, file)
+        save_user_password(username, password)
         
         # Save book collection
         save_collection(username, collection)
     except IOError as e:
         print(f"Error saving user data for {username}: {e}")
+        return False
+    return True
 
-def load_user_password(username):
-    """Loads the user's hashed password."""
+def get_password_hasher():
+    """Returns the password hasher, calibrating the bcrypt cost on first use if needed."""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(os.path.join(get_base_dir(), "auth.json"))
+    return _password_hasher
+
+def save_user_password(username, password):
+    """Hashes the password and saves it with the scheme and cost used."""
+    password_file = os.path.join(get_user_directory(username), "password.json")
+    atomic_write_json(password_file, get_password_hasher().hash(password), indent=None)
+
+def load_password_record(username):
+    """Loads the user's stored password record: the hash plus the parameters used."""
     password_file = os.path.join(get_user_directory(username), "password.json")
     
     if not os.path.exists(password_file):
@@ -135,55 +418,91 @@ def load_user_password(username):
     
     try:
         with open(password_file, "r") as file:
-            data = json.load(file)
-            return data.get("password")
+            return json.load(file)
     except (json.JSONDecodeError, IOError) as e:
         print(f"Error loading password for user {username}: {e}")
         return None
 
+def load_user_password(username):
+    """Loads the user's hashed password."""
+    record = load_password_record(username)
+    return record.get("password") if record else None
+
 def register_user(username, password, collection=None):
     """Registers a new user by saving the username, password, and collection."""
-    if os.path.exists(get_user_directory(username)):
-        return False  # Username already exists
-    
-    collection = collection or Collection()  # Initialize an empty collection if none provided
-    save_user_data(username, password, collection)
-    return True
+    registry = get_user_registry()
+    # The registry's lock is held until the name is taken, so two registrations can't
+    # both write the user's files. The name is taken last, once the password is saved.
+    with registry.file_lock:
+        if os.path.exists(os.path.join(get_base_dir(), username)) or registry.lookup(username) is not None:
+            return False  # Username already exists
+
+        collection = collection or Collection()  # Initialize an empty collection if none provided
+        if not save_user_data(username, password, collection):
+            return False
+        return registry.register(username)
 
 def login_user(username, password):
-    """Attempts to log in the user by checking the hashed password."""
-    stored_password = load_user_password(username)
+    """Attempts to log in the user by checking the hashed password.
+
+    This takes as long as the bcrypt cost demands, so call it off the GUI thread.
+    """
+    record = load_password_record(username)
     
-    if stored_password is None:
+    if record is None:
         return False  # User not found
     
-    return bcrypt.checkpw(password.encode(), stored_password.encode())
+    hasher = get_password_hasher()
+    if not hasher.verify(password, record):
+        return False
 
-def save_image_locally(image_url, isbn):
-    """Saves the book cover image locally from a URL."""
+    # Accounts from before the sharded layout are registered on their first login
     try:
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        img_data = BytesIO(response.content)
-        image = Image.open(img_data)
-
-        # Create a directory for storing images if it doesn't exist
-        image_dir = os.path.join(BASE_DIR, "user_images")
-        if not os.path.exists(image_dir):
-            os.makedirs(image_dir)
-
-        # Save the image
-        image_path = os.path.join(image_dir, f"{isbn}.jpg")
-        image.save(image_path)
-        return image_path
-    except requests.RequestException as e:
-        print(f"Error fetching image for ISBN {isbn}: {e}")
+        register_legacy_user(username)
     except IOError as e:
-        print(f"Error saving image locally for ISBN {isbn}: {e}")
-    return None
+        print(f"Error registering {username}: {e}")
+
+    # The password is known to be right, so upgrade a hash made at an outdated cost
+    if hasher.needs_rehash(record):
+        try:
+            save_user_password(username, password)
+        except IOError as e:
+            print(f"Error upgrading password hash for {username}: {e}")
+    return True
+
+def get_cover_store():
+    """Returns the shared content-addressed cover store."""
+    global _cover_store
+    if _cover_store is None:
+        _cover_store = CoverStore(os.path.join(get_base_dir(), "user_images"))
+    return _cover_store
+
+def save_image_locally(image_url, isbn):
+    """Saves the book cover image locally from a URL, reusing covers already stored."""
+    # Covers saved before the cover store existed are still valid, under either ISBN form
+    parsed = parse_isbn(isbn)
+    names = [isbn, str(parsed), parsed.isbn10] if parsed else [isbn]
+    legacy_paths = [os.path.join(get_base_dir(), "user_images", f"{name}.jpg") for name in names if name]
+    image_path = next((path for path in legacy_paths if os.path.exists(path)), None)
+    if image_path is None:
+        image_path = get_cover_store().save_cover(image_url, canonical_isbn(isbn))
+    if image_path:
+        # Pre-size the cover for the grid; existing thumbnails are left alone
+        generate_thumbnails(image_path)
+    return image_path
+
+def get_cover_downloader():
+    """Returns the background cover downloader, starting its workers on first use."""
+    global _cover_downloader
+    if _cover_downloader is None:
+        _cover_downloader = CoverDownloader(save_image_locally)
+    return _cover_downloader
 
 def display_collection(username, collection):
     """Displays the user's book collection in the GUI."""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QPixmap
+
     for book in collection:
         cover_image_path = book.cover_image_path
         if cover_image_path and os.path.exists(cover_image_path):
@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import struct
+import threading
+import contextlib
+from book import Book, FIELDS
+from file_lock import FileLock
+from json_stream import iter_json_array
+from binary_format import BINARY_EXTENSION, BinaryLibrary, is_binary_file, write_binary
+from collection import Collection
+
+# Names of the per-user book lists that every storage engine knows how to persist
+LIST_NAMES = ("collection", "wishlist")
+
+# Every list has a <list>.version file holding a counter that writers bump
+VERSION_EXTENSION = ".version"
+VERSION = struct.Struct("<Q")
+
+# Mutations are small tuples so they can be queued, logged or replayed by any engine:
+#   ("add", book_dict)
+#   ("remove", isbn)
+#   ("set_status", isbn, status)
+#   ("set_cover", isbn, cover_image_path)
+#   ("reorder", choice, alpha)
+
+
+def atomic_write_json(path, data, indent=4):
+    """Writes JSON to a temporary file and renames it over the target."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def encode_value(value, encode_string=json.encoder.encode_basestring_ascii):
+    return encode_string(value) if type(value) is str else json.dumps(value)
+
+
+def write_books_json(file, books):
+    """Writes books as the same indented array json.dump(..., indent=4) would.
+
+    Each book's fields are encoded straight from its attributes, so saving
+    builds no dict per book.
+    """
+    keys = [f'\n        "{field}": ' for field in FIELDS]
+    file.write("[")
+    separator = "\n    {"
+    for book in books:
+        file.write(separator)
+        separator = ",\n    {"
+        file.write(",".join(key + encode_value(getattr(book, field)) for key, field in zip(keys, FIELDS)))
+        file.write("\n    }")
+    # json.dump writes an empty list as [] and starts a non-empty one on its own line
+    file.write("]" if separator == "\n    {" else "\n]")
+
+
+def atomic_write_books(path, books):
+    """Writes a list of books as JSON to a temporary file and renames it over the target."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        write_books_json(file, books)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def file_signature(path):
+    """Returns (inode, size, mtime) for a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def read_version(path):
+    """Returns the counter stored in a version file, or 0 if there is none yet."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read(VERSION.size)
+    except IOError:
+        return 0
+    return VERSION.unpack(data)[0] if len(data) == VERSION.size else 0
+
+
+def write_version(path, version):
+    # Overwrites the counter in place; an aligned 8-byte write is never seen half done
+    with open(path, "r+b") as file:
+        file.write(VERSION.pack(version))
+        file.flush()
+
+
+def book_from_dict(book_data):
+    """Builds a Book from a stored record."""
+    return Book(
+        title=book_data.get("title"),
+        author=book_data.get("author"),
+        isbn=book_data.get("isbn"),
+        cover_image_path=book_data.get("cover_image_path"),
+        cover_url=book_data.get("cover_url"),
+        status=book_data.get("status", "Unread"),
+        date_added=book_data.get("date_added")
+    )
+
+
+def mutation_isbn(mutation):
+    """Returns the ISBN a mutation affects, or None for whole-list mutations."""
+    if mutation[0] == "add":
+        return mutation[1].get("isbn")
+    if mutation[0] in ("remove", "set_status", "set_cover"):
+        return mutation[1]
+    return None
+
+
+def apply_mutation(collection, mutation):
+    """Applies a single mutation tuple to an in-memory collection."""
+    op = mutation[0]
+    if op == "add":
+        collection.add_book(book_from_dict(mutation[1]))
+    elif op == "remove":
+        collection.remove_book(mutation[1])
+    elif op == "set_status":
+        collection.set_status(mutation[1], mutation[2])
+    elif op == "set_cover":
+        collection.set_cover(mutation[1], mutation[2])
+    elif op == "reorder":
+        collection.sort_books(mutation[2], mutation[1])
+    else:
+        raise ValueError(f"Unknown mutation '{op}'.")
+
+
+class StorageEngine:
+    """Interface shared by every storage backend used by storage.py."""
+    name = None
+    # Whether signature() means the same stored contents in every process and
+    # session, so it can be saved alongside data derived from the list
+    durable_signatures = False
+
+    def load_list(self, username, list_name):
+        """Returns the books stored in one of the user's lists, in order."""
+        raise NotImplementedError
+
+    def iter_list(self, username, list_name):
+        """Yields the books in one of the user's lists, building each one as it is reached."""
+        return iter(self.load_list(username, list_name))
+
+    def save_list(self, username, list_name, books):
+        """Replaces the contents of one of the user's lists; raises if it cannot be written."""
+        raise NotImplementedError
+
+    def signature(self, username, list_name):
+        """Returns a cheap token that changes whenever the stored list changes."""
+        raise NotImplementedError
+
+    def lock_for(self, username, list_name):
+        """Returns the lock writers of one list hold; readers never take it."""
+        return contextlib.nullcontext()
+
+    def writing(self, username, list_name):
+        """Returns a context manager held around every change to one list."""
+        return self.lock_for(username, list_name)
+
+    def apply_mutations(self, username, list_name, mutations):
+        """Applies a sequence of mutations to one of the user's lists; raises if they cannot be written."""
+        with self.writing(username, list_name):
+            # Stored lists are already free of duplicates, so skip add_book's per-book check
+            collection = Collection()
+            collection.books = self.load_list(username, list_name)
+            for mutation in mutations:
+                apply_mutation(collection, mutation)
+            self.save_list(username, list_name, collection)
+
+    def write_changes(self, username, list_name, mutations, books=None, base=None):
+        """Persists a batch of queued mutations.
+
+        base is the signature of the stored list the caller's books started from.
+        Whole-file engines write the caller's current list in one go while the
+        stored list still has that signature. If someone else wrote in between,
+        the mutations are replayed onto the stored list instead, so their changes
+        to other books are kept rather than overwritten.
+
+        Returns the list's new signature when the stored list now matches the
+        caller's copy, or None when it also holds changes the caller hasn't seen.
+        """
+        with self.lock_for(username, list_name):
+            current = base is not None and self.signature(username, list_name) == base
+            if books is None or not current:
+                self.apply_mutations(username, list_name, mutations)
+            else:
+                self.save_list(username, list_name, books)
+            return self.signature(username, list_name) if current else None
+
+    def close(self):
+        """Releases any resources held by the engine."""
+        pass
+
+
+class JSONStorageEngine(StorageEngine):
+    """Stores each list as a file in the user's directory.
+
+    Lists are pretty-printed JSON arrays by default. Users converted with
+    binary_format.py have <list>.slib files instead, which are detected
+    automatically and kept in that format when saved.
+    """
+    name = "json"
+    # The version counter and the list file's inode, size and mtime are on disk
+    durable_signatures = True
+
+    def __init__(self, user_directory):
+        # user_directory is a callable mapping a username to its data directory
+        self.user_directory = user_directory
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+        self.writing_lists = set()
+
+    def list_path(self, username, list_name):
+        binary_path = os.path.join(self.user_directory(username), f"{list_name}{BINARY_EXTENSION}")
+        if os.path.exists(binary_path):
+            return binary_path
+        return os.path.join(self.user_directory(username), f"{list_name}.json")
+
+    def write_snapshot(self, username, list_name, books):
+        """Atomically writes a whole list in the format the user's files are in."""
+        path = self.list_path(username, list_name)
+        if path.endswith(BINARY_EXTENSION):
+            write_binary(path, books)
+        else:
+            atomic_write_books(path, books)
+
+    def version_path(self, username, list_name):
+        return os.path.join(self.user_directory(username), f"{list_name}{VERSION_EXTENSION}")
+
+    def lock_for(self, username, list_name):
+        # The version file doubles as the list's advisory lock file
+        path = self.version_path(username, list_name)
+        with self.locks_guard:
+            if path not in self.locks:
+                self.locks[path] = FileLock(path)
+            return self.locks[path]
+
+    @contextlib.contextmanager
+    def writing(self, username, list_name):
+        """Holds the list's lock and bumps its version around a change.
+
+        The version is odd while files are being swapped and even once they are
+        consistent again, so readers can tell a finished write from one in progress.
+        """
+        path = self.version_path(username, list_name)
+        with self.lock_for(username, list_name):
+            if path in self.writing_lists:
+                # Nested inside a change this thread is already making
+                yield
+                return
+            version = read_version(path)
+            # An odd version left behind means a writer crashed mid-change
+            version += version % 2
+            write_version(path, version + 1)
+            self.writing_lists.add(path)
+            try:
+                yield
+            finally:
+                self.writing_lists.discard(path)
+                write_version(path, version + 2)
+
+    def version(self, username, list_name):
+        """Returns the list's version without taking its lock.
+
+        While another writer is swapping files in (odd version) this waits for it
+        to finish, unless no process holds the lock any more, which means that
+        writer crashed.
+        """
+        path = self.version_path(username, list_name)
+        lock = self.lock_for(username, list_name)
+        while True:
+            version = read_version(path)
+            if version % 2 == 0 or lock.held_by_current_thread() or not lock.is_held_elsewhere():
+                return version - version % 2
+            time.sleep(0.001)
+
+    def signature(self, username, list_name):
+        return (self.version(username, list_name), file_signature(self.list_path(username, list_name)))
+
+    def load_list(self, username, list_name):
+        try:
+            return list(self.iter_list(username, list_name))
+        except (ValueError, IOError) as e:
+            print(f"Error loading {list_name} for user {username}: {e}")
+            return []
+
+    def iter_list(self, username, list_name):
+        # Records are parsed incrementally, so the first book is ready before the
+        # whole file has been read and the raw records never sit in memory together
+        list_file = self.list_path(username, list_name)
+
+        if not os.path.exists(list_file):
+            return
+
+        if is_binary_file(list_file):
+            with BinaryLibrary(list_file) as library:
+                yield from library
+            return
+
+        with open(list_file, "r") as file:
+            for book_data in iter_json_array(file):
+                yield book_from_dict(book_data)
+
+    def save_list(self, username, list_name, books):
+        user_directory = self.user_directory(username)
+
+        if not os.path.exists(user_directory):
+            os.makedirs(user_directory)
+
+        with self.writing(username, list_name):
+            self.write_snapshot(username, list_name, books)
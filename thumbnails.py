@@ -0,0 +1,82 @@
+import os
+import sys
+
+# Fixed thumbnail sizes, generated once per cover so the grid never rescales
+THUMBNAIL_SIZES = {
+    "card": (150, 225),
+    "card@2x": (300, 450),
+    "icon": (50, 75),
+}
+THUMBNAIL_DIR = ".thumbs"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def thumbnail_path(image_path, size_name):
+    """Returns where the thumbnail of a given size for an image is stored."""
+    directory, filename = os.path.split(image_path)
+    name = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAIL_DIR, size_name, f"{name}.jpg")
+
+
+def card_thumbnail_path(image_path, pixel_ratio=1.0):
+    """Returns (path, pixel ratio) of the best existing card thumbnail, or (None, 1.0)."""
+    candidates = [("card@2x", 2.0), ("card", 1.0)] if pixel_ratio > 1 else [("card", 1.0)]
+    for size_name, ratio in candidates:
+        path = thumbnail_path(image_path, size_name)
+        if os.path.exists(path):
+            return path, ratio
+    return None, 1.0
+
+
+def generate_thumbnails(image_path, force=False):
+    """Writes every thumbnail size for one image; returns the number written."""
+    from PIL import Image, ImageOps
+
+    written = 0
+    try:
+        with Image.open(image_path) as image:
+            image = image.convert("RGB")
+            source_mtime = os.path.getmtime(image_path)
+            for size_name, size in THUMBNAIL_SIZES.items():
+                path = thumbnail_path(image_path, size_name)
+                if not force and os.path.exists(path) and os.path.getmtime(path) >= source_mtime:
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Crop to the card's aspect ratio and resize to exactly the target size
+                thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+                temp_path = f"{path}.tmp"
+                thumbnail.save(temp_path, "JPEG", quality=85)
+                os.replace(temp_path, path)
+                written += 1
+    except (IOError, ValueError) as e:
+        print(f"Error creating thumbnails for {image_path}: {e}")
+    return written
+
+
+def find_images(directory):
+    """Yields every cover image under a directory, skipping existing thumbnails."""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if name != THUMBNAIL_DIR]
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, filename)
+
+
+def backfill(directory, workers=None, force=False):
+    """Generates missing thumbnails for every image in a directory across all CPU cores."""
+    # Imported here so the GUI doesn't load multiprocessing at startup
+    from concurrent.futures import ProcessPoolExecutor
+
+    images = list(find_images(directory))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        written = sum(executor.map(generate_thumbnails, images, [force] * len(images), chunksize=16))
+    return len(images), written
+
+
+if __name__ == "__main__":
+    # Usage: python thumbnails.py [user_images directory] [--force]
+    args = [arg for arg in sys.argv[1:] if arg != "--force"]
+    base_dir = os.environ.get("SHELFLIFE_DATA_DIR") or os.path.join(os.getcwd(), "user_data")
+    directory = args[0] if args else os.path.join(base_dir, "user_images")
+    images, written = backfill(directory, force="--force" in sys.argv)
+    print(f"Checked {images} images, wrote {written} thumbnails")
@@ -1,11 +1,13 @@
 import sys
 from PyQt5.QtWidgets import QDesktopWidget, QApplication, QMainWindow, QStackedWidget, QLabel, QVBoxLayout, QWidget, QHBoxLayout
 from PyQt5.QtGui import QPixmap, QMovie
-from PyQt5.QtCore import Qt, QRect, QTimer
+from PyQt5.QtCore import Qt, QRect, QTimer, QObject, pyqtSignal
 from login_page import LoginPage
 from book_search_page import BookSearchPage
 from collection_page import CollectionPage
 from wishlist_page import WishlistPage
+from library_repository import LibraryRepository
+from storage import flush, get_cover_downloader
 
 class SplashScreen(QWidget):
     def __init__(self):
@@ -52,12 +54,27 @@ class SplashScreen(QWidget):
         y = (screen.height() - widget_geometry.height()) // 2
 
 
+class CoverNotifier(QObject):
+    # Carries finished cover downloads from worker threads to the GUI thread
+    cover_ready = pyqtSignal(str, str)
+
+    def notify(self, isbn, path):
+        if path:
+            self.cover_ready.emit(isbn, path)
+
+
 class AppController(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Shelf Life Book Manager")
         self.setGeometry(100, 100, 800, 900)  # Increased size for better UI experience
         self.current_user = None
+        self.repository = None
+
+        # Refresh covers as background downloads finish
+        self.cover_notifier = CoverNotifier()
+        self.cover_notifier.cover_ready.connect(self.on_cover_ready)
+        get_cover_downloader().add_listener(self.cover_notifier.notify)
 
         # Apply custom styling
         self.apply_styles()
@@ -144,42 +161,68 @@ class AppController(QMainWindow):
         from PyQt5.QtWidgets import QMessageBox
         QMessageBox.information(self, "Login Success", f"Welcome, {user.username}!")
         self.current_user = user
+        self.repository = LibraryRepository(user.username)
+        self.queue_pending_covers()
         self.show_book_search_page()
 
+    def queue_pending_covers(self):
+        # Resume cover downloads that had not finished in an earlier session
+        downloader = get_cover_downloader()
+        for cover_url, isbn in self.repository.pending_covers():
+            downloader.submit(cover_url, isbn)
+
+    def on_cover_ready(self, isbn, path):
+        # Store the finished cover; the visible page refreshes just that card from the change event
+        if self.repository is None:
+            return
+        self.repository.set_cover(isbn, path)
+
     def show_book_search_page(self):
         # Display the book search page.
-        book_search_page = BookSearchPage(self.current_user, self.show_collection_page, self.show_wishlist_page, self.logout)
+        book_search_page = BookSearchPage(self.current_user, self.repository, self.show_collection_page, self.show_wishlist_page, self.logout)
         self.stacked_widget.addWidget(book_search_page)
         self.stacked_widget.setCurrentWidget(book_search_page)
 
     def show_collection_page(self):
         # Display the user's book collection page.
-        collection_page = CollectionPage(self.current_user, self.show_book_search_page, self.logout)
+        collection_page = CollectionPage(self.current_user, self.repository, self.show_book_search_page, self.logout)
         self.stacked_widget.addWidget(collection_page)
         self.stacked_widget.setCurrentWidget(collection_page)
 
     def show_wishlist_page(self):
         # Display the user's wishlist page
-        wishlist_page = WishlistPage(self.current_user, self.show_book_search_page, self.logout)
+        wishlist_page = WishlistPage(self.current_user, self.repository, self.show_book_search_page, self.logout)
         self.stacked_widget.addWidget(wishlist_page)
         self.stacked_widget.setCurrentWidget(wishlist_page)
 
+    def save_indexes(self):
+        # Keep the search indexes and stats so the next login doesn't rebuild them
+        if self.repository is not None:
+            self.repository.save_search_indexes()
+            self.repository.save_stats()
+
     def logout(self):
         # Handle user logout and return to the login page.
         from PyQt5.QtWidgets import QMessageBox
+        # Make sure every queued change is on disk before the session ends
+        flush()
+        self.save_indexes()
         self.current_user = None
+        self.repository = None
         QMessageBox.information(self, "Logout", "You have been logged out successfully.")
         self.show_login_page()
 
 def main():
     # Main entry point for the application.
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(flush)
 
     # Show splash screen
     splash = SplashScreen()
     splash.show()
 
     controller = AppController()
+    app.aboutToQuit.connect(controller.save_indexes)
 
     # Close splash and show main window after 3 seconds
     QTimer.singleShot(3000, splash.close)
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import threading
+from file_lock import FileLock
+
+USERS_DIR = "users"
+REGISTRY_FILENAME = "users.log"
+
+
+def shard(username):
+    """Returns the shard a user's directory lives in: the first two hex digits of its hash."""
+    return hashlib.sha256(username.encode("utf-8")).hexdigest()[:2]
+
+
+class UserRegistry:
+    """Index of every account and where its data lives.
+
+    User directories are spread over users/<shard>/<username> so no single
+    directory grows with the number of accounts. users.log is an append-only
+    list of JSON entries (username, creation time, directory relative to the
+    base directory), so looking up or listing users never scans directories.
+    Entries appended by other processes are picked up on the next miss.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, REGISTRY_FILENAME)
+        self.file_lock = FileLock(os.path.join(base_dir, "users.lock"))
+        self.users = {}
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reads entries appended since the registry was last read."""
+        with self.lock:
+            try:
+                with open(self.path, "rb") as file:
+                    file.seek(self.offset)
+                    for line in file:
+                        if not line.endswith(b"\n"):
+                            break  # An entry still being written
+                        self.offset += len(line)
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        self.users.setdefault(entry["username"], {}).update(entry)
+            except IOError:
+                pass
+
+    def sharded_directory(self, username):
+        return os.path.join(self.base_dir, USERS_DIR, shard(username), username)
+
+    def lookup(self, username):
+        """Returns a user's registry entry, or None if there is no such user."""
+        if username not in self.users:
+            self.refresh()
+        return self.users.get(username)
+
+    def user_directory(self, username):
+        """Returns where a user's data is stored (the sharded location for new users)."""
+        entry = self.lookup(username)
+        if entry and entry.get("directory"):
+            return os.path.join(self.base_dir, entry["directory"])
+        return self.sharded_directory(username)
+
+    def register(self, username, directory=None, **metadata):
+        """Adds a user; returns False if the username is already taken."""
+        with self.file_lock:
+            self.refresh()
+            if username in self.users:
+                return False
+            directory = directory or self.sharded_directory(username)
+            entry = {
+                "username": username,
+                "created": metadata.pop("created", time.time()),
+                "directory": os.path.relpath(directory, self.base_dir),
+            }
+            entry.update(metadata)
+            self.append(entry)
+            return True
+
+    def append(self, entry):
+        # Must be called with the file lock held
+        os.makedirs(self.base_dir, exist_ok=True)
+        with open(self.path, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.refresh()
+
+    def usernames(self):
+        """Returns every registered username, in registration order."""
+        self.refresh()
+        return list(self.users)
+
+    def __contains__(self, username):
+        return self.lookup(username) is not None
+
+    def __len__(self):
+        self.refresh()
+        return len(self.users)
+
+
+def is_user_directory(path):
+    return os.path.isfile(os.path.join(path, "password.json"))
+
+
+def list_users(base_dir):
+    """Returns (username, directory) for every account, including ones not migrated yet."""
+    registry = UserRegistry(base_dir)
+    users = [(username, registry.user_directory(username)) for username in registry.usernames()]
+    for name in sorted(os.listdir(base_dir)) if os.path.isdir(base_dir) else []:
+        path = os.path.join(base_dir, name)
+        if name not in registry.users and is_user_directory(path):
+            users.append((name, path))
+    return users
+
+
+def migrate_flat_layout(base_dir):
+    """Moves user directories from base_dir/<username> into shards and registers them.
+
+    Users that are already sharded but missing from the registry (for example
+    after the registry was deleted) are registered again. Run it while no
+    ShelfLife instance is using base_dir. Returns the number of users moved.
+    """
+    registry = UserRegistry(base_dir)
+    moved = 0
+
+    for name in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, name)
+        if name == USERS_DIR or not os.path.isdir(path) or not is_user_directory(path):
+            continue
+        target = registry.sharded_directory(name)
+        if os.path.exists(target):
+            print(f"Skipping {name}: {target} already exists")
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        moved += 1
+        # Users seen before migrating point at the flat directory; the newest entry wins
+        entry = {"username": name, "directory": os.path.relpath(target, base_dir)}
+        if name not in registry:
+            entry["created"] = os.path.getmtime(os.path.join(target, "password.json"))
+        with registry.file_lock:
+            registry.append(entry)
+
+    users_dir = os.path.join(base_dir, USERS_DIR)
+    if os.path.isdir(users_dir):
+        for shard_name in sorted(os.listdir(users_dir)):
+            shard_dir = os.path.join(users_dir, shard_name)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                path = os.path.join(shard_dir, name)
+                if name not in registry and is_user_directory(path):
+                    registry.register(name, path, created=os.path.getmtime(path))
+    return moved
+
+
+if __name__ == "__main__":
+    # Usage: python user_registry.py migrate|list [user_data directory]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("migrate", "list"):
+        print("Usage: python user_registry.py migrate|list [user_data directory]")
+        sys.exit(1)
+    base_dir = sys.argv[2] if len(sys.argv) > 2 else \
+        os.environ.get("SHELFLIFE_DATA_DIR") or os.path.join(os.getcwd(), "user_data")
+    if sys.argv[1] == "migrate":
+        moved = migrate_flat_layout(base_dir)
+        print(f"Moved {moved} users; {len(UserRegistry(base_dir))} users registered")
+    else:
+        for username in UserRegistry(base_dir).usernames():
+            print(username)
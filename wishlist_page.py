@@ -1,10 +1,15 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit, QGridLayout, QApplication, QPushButton, QLabel, QHBoxLayout, QScrollArea, QFrame,
-    QComboBox
+    QComboBox, QCheckBox
 )
 from PyQt5.QtGui import QPixmap, QFont
 from PyQt5.QtCore import Qt
-from storage import load_wishlist, save_wishlist, load_collection, save_collection
+from thumbnails import card_thumbnail_path
+from stats_dialog import StatsDialog
+from list_changes import REMOVED, UPDATED
+
+# Cards built at a time; more are added as the grid is scrolled
+PAGE_SIZE = 60
 
 class BookCard(QFrame):
     def __init__(self, book, image_path, move_callback, remove_callback, status_change_callback):
@@ -29,19 +34,7 @@ class BookCard(QFrame):
         # Cover Image
         self.image_label = QLabel()
         self.image_label.setFixedSize(150, 225)
-        self.image_label.setScaledContents(True)
-        if image_path:
-            pixmap = QPixmap(image_path).scaled(
-                150, 225,
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.image_label.setPixmap(pixmap)
-        else:
-            # Placeholder image
-            pixmap = QPixmap(150, 225)
-            pixmap.fill(Qt.lightGray)
-            self.image_label.setPixmap(pixmap)
+        self.set_cover(image_path)
 
         layout.addWidget(self.image_label, alignment=Qt.AlignCenter)
 
@@ -114,20 +107,56 @@ class BookCard(QFrame):
         # Enable hover effects
         self.setMouseTracking(True)
 
+    def set_status(self, status):
+        # Shows a status changed elsewhere without reporting it back as a change
+        self.status_dropdown.blockSignals(True)
+        self.status_dropdown.setCurrentText(status)
+        self.status_dropdown.blockSignals(False)
+
+    def set_cover(self, image_path):
+        # Prefer a pre-sized thumbnail so nothing is rescaled while painting
+        thumbnail, pixel_ratio = card_thumbnail_path(image_path, self.devicePixelRatioF()) if image_path else (None, 1.0)
+        if thumbnail:
+            pixmap = QPixmap(thumbnail)
+            pixmap.setDevicePixelRatio(pixel_ratio)
+            self.image_label.setScaledContents(False)
+            self.image_label.setPixmap(pixmap)
+        elif image_path:
+            pixmap = QPixmap(image_path).scaled(
+                150, 225,
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation
+            )
+            self.image_label.setScaledContents(True)
+            self.image_label.setPixmap(pixmap)
+        else:
+            # Placeholder image (also shown while the cover is still downloading)
+            pixmap = QPixmap(150, 225)
+            pixmap.fill(Qt.lightGray)
+            self.image_label.setScaledContents(True)
+            self.image_label.setPixmap(pixmap)
+
 
 class WishlistPage(QWidget):
-    def __init__(self, user, show_book_search_callback, logout_callback):
+    def __init__(self, user, repository, show_book_search_callback, logout_callback):
         super().__init__()
 
         self.current_status = "None"
 
         self.user = user
+        self.repository = repository
         self.show_book_search_callback = show_book_search_callback
         self.logout_callback = logout_callback
 
         # Image cache to prevent garbage collection
         self.book_images = {}
 
+        # Cards currently in the grid, by ISBN, so a single card can be refreshed
+        self.cards = {}
+
+        # Cursor of the next window of books to show, or None once all are shown
+        self.next_cursor = None
+
         # Setup UI
         self.init_ui()
 
@@ -162,7 +191,7 @@ class WishlistPage(QWidget):
 
         #sort alphabetically by author or title
         self.alpha_sort = QComboBox(self)
-        self.alpha_sort.addItems(["A-Z: Title", "A-Z: Author", "Z-A: Title", "Z-A: Author"])
+        self.alpha_sort.addItems(["A-Z: Title", "A-Z: Author", "Z-A: Title", "Z-A: Author", "Newest First", "Oldest First"])
         self.alpha_sort.currentIndexChanged.connect(self.update_alpha2)
         self.alpha_sort.setStyleSheet("""
                     QComboBox {
@@ -216,7 +245,7 @@ class WishlistPage(QWidget):
 
         # Search bar
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Search by title or ISBN...")
+        self.search_bar.setPlaceholderText("Search by title, author or ISBN...")
         self.search_bar.textChanged.connect(self.filter_wishlist)
         self.search_bar.setStyleSheet("""
               QLineEdit {
@@ -230,10 +259,41 @@ class WishlistPage(QWidget):
               }
         """)
 
+        # Typo-tolerant search
+        self.fuzzy_search = QCheckBox("Fuzzy")
+        self.fuzzy_search.setToolTip("Also match words spelled similarly")
+        self.fuzzy_search.stateChanged.connect(lambda: self.filter_wishlist(self.search_bar.text()))
+        self.fuzzy_search.setStyleSheet("""
+            QCheckBox {
+                color: #c87f4a;
+                font-family: Bahnschrift SemiBold;
+                font-size: 12pt;
+            }
+        """)
+
+        # Counts by status, author and month added
+        stats_button = QPushButton("Stats")
+        stats_button.setStyleSheet("""
+            QPushButton {
+                background-color: #c87f4a; 
+                color: white; 
+                padding: 10px;
+                border-radius: 5px;
+                font-family: Bahnschrift SemiBold;
+                font-size: 12pt;
+            }
+            QPushButton:hover {
+                background-color: #a66a40;
+            }
+        """)
+        stats_button.clicked.connect(self.show_stats)
+
         nav_layout.addWidget(back_button)
         nav_layout.addWidget(self.search_bar)
+        nav_layout.addWidget(self.fuzzy_search)
         nav_layout.addWidget(self.alpha_sort)
         nav_layout.addWidget(self.filter_options)
+        nav_layout.addWidget(stats_button)
         nav_layout.addWidget(logout_button)
         main_layout.addLayout(nav_layout)
 
@@ -241,6 +301,7 @@ class WishlistPage(QWidget):
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
         self.scroll_area.setStyleSheet("background-color: #EAD2A8; border: none;")
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.load_more)
 
         # Grid Widget
         self.grid_widget = QWidget()
@@ -275,47 +336,75 @@ class WishlistPage(QWidget):
             self.current_status = "Read"
         self.display_wishlist()
 
+    def status_filter(self):
+        # The status chosen in the filter dropdown, or None to show every book
+        return None if self.current_status == "None" else self.current_status
+
     def update_alpha2(self, index):
-        #{"title": "title", "author": "author", "status": "status"}
-        wishlist = load_wishlist(self.user.username)
+        # Only the displayed order changes; the list is not re-sorted or saved
         if index == 0:
-            wishlist.sort_books(True, "title")
+            self.repository.sort_list(True, "title", "wishlist")
         elif index == 1:
-            wishlist.sort_books(True, "author")
+            self.repository.sort_list(True, "author", "wishlist")
         elif index == 2:
-            wishlist.sort_books(False, "title")
+            self.repository.sort_list(False, "title", "wishlist")
         elif index == 3:
-            wishlist.sort_books(False, "author")
-        save_wishlist(self.user.username, wishlist)
+            self.repository.sort_list(False, "author", "wishlist")
+        elif index == 4:
+            self.repository.sort_list(False, "date_added", "wishlist")
+        elif index == 5:
+            self.repository.sort_list(True, "date_added", "wishlist")
         self.display_wishlist()
 
 
-    def display_wishlist(self, books=None,):
-        current_status = self.current_status
-        #print(self.current_status)         Used for debugging
+    def showEvent(self, event):
+        # Follow changes to the wishlist only while the page is on screen
+        super().showEvent(event)
+        self.repository.subscribe(self.on_changes, "wishlist")
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.repository is not None:
+            self.repository.unsubscribe(self.on_changes, "wishlist")
+
+    def grid_columns(self):
+        # Calculate grid dimensions based on screen size
+        screen = QApplication.primaryScreen().geometry()
+        screen_width = screen.width()
+
+        # Determine number of columns based on screen width
+        return 3 if screen_width > 1600 else (2 if screen_width > 800 else 1)
+
+    def display_wishlist(self, books=None, refresh=True):
+        # print(self.current_status)        Used for debugging
         # Clear existing grid
         for i in reversed(range(self.grid_layout.count())):
             widget = self.grid_layout.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
+        self.cards = {}
+        self.next_cursor = None
 
-        # Load collection if not provided
+        # Load the first window of the wishlist if not provided; the rest follows as it is scrolled
         if books is None or books == False: #some weird typing issue comes up if False isn't here
-            books = load_wishlist(self.user.username).to_list()
+            window = self.repository.query(
+                "wishlist", self.search_bar.text(), status=self.status_filter(), limit=PAGE_SIZE, refresh=refresh,
+                fuzzy=self.fuzzy_search.isChecked()
+            )
+            books, self.next_cursor = window.books, window.next_cursor
 
         # Show/hide no results label
         self.no_results_label.setVisible(len(books) == 0)
 
-        # Calculate grid dimensions based on screen size
-        screen = QApplication.primaryScreen().geometry()
-        screen_width = screen.width()
+        self.add_cards(books)
 
-        # Determine number of columns based on screen width
-        columns = 3 if screen_width > 1600 else (2 if screen_width > 800 else 1)
+    def add_cards(self, books):
+        current_status = self.current_status
+        columns = self.grid_columns()
 
-        # Populate grid
-        for idx, book in enumerate(books):
-                   #show books matching the current status of collection
+        # Populate grid after the cards already shown
+        for idx, book in enumerate(books, len(self.cards)):
+                   #show books matching the current status of wishlist
             if current_status == "None" or getattr(book, 'status') == current_status:
                 row = idx // columns
                 col = idx % columns
@@ -331,44 +420,89 @@ class WishlistPage(QWidget):
                     self.remove_book,
                     self.change_status
                 )
+                self.cards[book.isbn] = book_card
 
                 # Add to grid
                 self.grid_layout.addWidget(book_card, row, col)
 
-    def filter_wishlist(self, query):
-        # Dynamically filter the collection based on search query
-        # Load collection
-        wishlist = load_wishlist(self.user.username)
-
-        # Search books
-        filtered_books = wishlist.search_books(query)
+    def load_more(self, value):
+        # Build the next window of cards once the grid is scrolled near its end
+        scroll_bar = self.scroll_area.verticalScrollBar()
+        if self.next_cursor is None or value < scroll_bar.maximum() - scroll_bar.pageStep():
+            return
+        window = self.repository.query(
+            "wishlist", self.search_bar.text(), status=self.status_filter(), cursor=self.next_cursor,
+            limit=PAGE_SIZE, refresh=False, fuzzy=self.fuzzy_search.isChecked()
+        )
+        self.next_cursor = window.next_cursor
+        self.add_cards(window.books)
 
-        # Display filtered books
-        self.display_wishlist(filtered_books)
+    def filter_wishlist(self, query):
+        # Dynamically filter the wishlist based on search query
+        # Use the in-memory wishlist; typing never goes back to disk
+        # Search books, keeping the chosen sort order
+        self.display_wishlist(refresh=False)
 
     def change_status(self, book, new_status):
-        wishlist = load_wishlist(self.user.username)
-        for b in wishlist:
-            if b.isbn == book.isbn:
-                b.status = new_status
-                break
-        save_wishlist(self.user.username, wishlist)
+        self.repository.update_book_status(book.isbn, new_status, "wishlist")
 
     def remove_book(self, book):
-        wishlist = load_wishlist(self.user.username)
-        wishlist.remove_book(book.isbn)
-        save_wishlist(self.user.username, wishlist)
-        self.display_wishlist()
+        # The card is taken off the grid when the wishlist reports the removal
+        self.repository.remove_book(book.isbn, "wishlist")
 
     def move_book(self, book):
         try:
-            wishlist = load_wishlist(self.user.username)
-            wishlist.remove_book(book.isbn)
-            save_wishlist(self.user.username, wishlist)
-
-            collection = load_collection(self.user.username)
-            collection.add_book(book)
-            save_collection(self.user.username, collection)
-            self.display_wishlist()
+            self.repository.remove_book(book.isbn, "wishlist")
+            self.repository.add_book(book, "collection")
         except Exception as e:
             print(f"Error moving book: {e}")
+
+    def show_stats(self):
+        # The stats are kept up to date as books change, so nothing is counted here
+        StatsDialog("Wishlist", self.repository.get_stats("wishlist"), self).exec_()
+
+    def on_changes(self, changes):
+        # Update only the cards a change affects instead of rebuilding the grid
+        removed = False
+        for change in changes:
+            if change.kind == UPDATED:
+                if change.isbn not in self.cards:
+                    continue
+                if "status" in change.old:
+                    # A book that no longer matches the status filter leaves the page
+                    if self.status_filter() not in (None, change.book.status):
+                        removed = self.remove_card(change.isbn) or removed
+                    else:
+                        self.cards[change.isbn].set_status(change.book.status)
+                if "cover_image_path" in change.old:
+                    self.update_cover(change.isbn, change.book.cover_image_path)
+            elif change.kind == REMOVED:
+                removed = self.remove_card(change.isbn) or removed
+            else:
+                # Added books, reorders and reloads change which books show and where
+                self.filter_wishlist(self.search_bar.text())
+                return
+        if removed:
+            self.relayout()
+
+    def remove_card(self, isbn):
+        card = self.cards.pop(isbn, None)
+        if card is None:
+            return False
+        self.grid_layout.removeWidget(card)
+        card.deleteLater()
+        return True
+
+    def relayout(self):
+        # Close the gaps left by removed cards, keeping the others as they are
+        columns = self.grid_columns()
+        for idx, card in enumerate(self.cards.values()):
+            self.grid_layout.removeWidget(card)
+            self.grid_layout.addWidget(card, idx // columns, idx % columns)
+        self.no_results_label.setVisible(len(self.cards) == 0)
+
+    def update_cover(self, isbn, image_path):
+        # Called when a background cover download finishes
+        card = self.cards.get(isbn)
+        if card:
+            card.set_cover(image_path)